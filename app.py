@@ -1,19 +1,31 @@
-from dash import Dash, dcc, html
-from dash.dependencies import Input, Output, State
+from dash import Dash, dcc, html, no_update, ctx
+from dash.dependencies import Input, Output, State, MATCH
 import dash_bootstrap_components as dbc
+import flask
 
 import plotly.io as pio
 import plotly.graph_objects as go
 
 import json
-import pandas as pd
 
-import base64
-import io
+import copy
+import os
+from datetime import datetime
 
 from pages import readme, data, growth, retention, churn, kpis
-from utils.dash import get_header_buttons, get_navigation, DashboardColors
+from utils.dash import (
+    get_header_buttons,
+    get_navigation,
+    get_table_filters,
+    DashboardColors,
+)
 from utils.model import DataModel
+from utils.cache import ModelCache, get_file_hash, get_as_of
+from utils.figures import FigureRegistry
+from utils.jobs import JobRunner
+from utils.ingestion import read_subscriptions, get_errors_message
+from utils.metrics import metrics
+from utils.upload import UploadStore
 
 # Plotly template
 with open("assets/template.json", "r") as f:
@@ -23,6 +35,15 @@ pio.templates.default = "plotly_template"
 
 # Dash params
 DASHBOARD_NAME = "Subscription model analytics"
+MODEL_PATH = "models"
+MODEL_CACHE_SIZE = 2 * 1024**3
+UPLOAD_PATH = "uploads"
+JOB_PATH = "jobs"
+METRICS_PATH = "metrics"
+JOB_WORKERS = 2
+INGESTION_ENGINE = "pyarrow"
+FIT_PROCESSES = os.cpu_count()
+FIT_PARALLEL_ROWS = 1_000_000
 
 # Dash app
 app = Dash(
@@ -80,12 +101,31 @@ content = dcc.Loading(
     ],
 )
 
+# Models cached on disk by input file and date, the browser only keeps the key
+# of its model
+model_cache = ModelCache(MODEL_PATH, MODEL_CACHE_SIZE)
+
+# Figures of cached models, created when a page or tab is first displayed
+# (only the aggregates they use are computed)
+figure_registry = FigureRegistry(model_cache)
+
+# Files uploaded by chunks, streamed to disk
+upload_store = UploadStore(UPLOAD_PATH)
+
+# Models are fitted in background processes, the page polls their progress
+job_runner = JobRunner(JOB_PATH, JOB_WORKERS)
+
+# Stages of the model logged as JSON, with totals of the app and job processes
+# on disk for the metrics endpoint
+metrics.configure(METRICS_PATH)
+
 # Storage
 storage = html.Div(
     [
-        dcc.Store(id="store-input-data"),
-        dcc.Store(id="store-model-charts"),
-        dcc.Store(id="store-model-kpis"),
+        dcc.Store(id="store-upload"),
+        dcc.Store(id="store-model-key"),
+        dcc.Store(id="store-job"),
+        dcc.Interval(id="interval-job", interval=1000, disabled=True),
     ]
 )
 
@@ -93,139 +133,339 @@ storage = html.Div(
 app.layout = html.Div([dcc.Location(id="url"), header, content, storage])
 
 
+# Upload endpoints, used by assets/upload.js
+@server.route("/upload/<upload_id>", methods=["GET"])
+def get_upload(upload_id):
+    try:
+        return flask.jsonify({"size": upload_store.get_size(upload_id)})
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
+
+@server.route("/upload/<upload_id>", methods=["POST"])
+def post_upload_chunk(upload_id):
+    try:
+        upload_store.get_filename(upload_id)
+        offset = int(flask.request.args.get("offset", 0))
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
+    try:
+        size = upload_store.append(upload_id, offset, flask.request.stream)
+    except ValueError as e:
+        # Chunk not at the end of the upload, the client resumes from its size
+        return (
+            flask.jsonify({"error": str(e), "size": upload_store.get_size(upload_id)}),
+            409,
+        )
+    return flask.jsonify({"size": size})
+
+
+# Active users endpoint, at a date or between two dates, for a model or the
+# most recently used one
+@server.route("/active_users", methods=["GET"])
+def get_active_users():
+    args = flask.request.args
+    model_key = args.get("model_key")
+    if model_key:
+        model = model_cache.load(model_key)
+    else:
+        model, _ = model_cache.get_latest()
+    if model is None:
+        return flask.jsonify({"error": "No model"}), 404
+
+    try:
+        if "at" in args:
+            result = {
+                "at": args["at"],
+                "active_users": model.active_count(at=args["at"]),
+            }
+        elif "start" in args and "end" in args:
+            result = {
+                "start": args["start"],
+                "end": args["end"],
+                "active_users": model.active_count(
+                    between=(args["start"], args["end"])
+                ),
+            }
+        else:
+            raise ValueError("Expected at, or start and end dates")
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+    return flask.jsonify(result)
+
+
+# Metrics endpoint, stage totals in the Prometheus text format
+@server.route("/metrics", methods=["GET"])
+def get_metrics():
+    return flask.Response(
+        metrics.get_prometheus_text(), mimetype="text/plain; version=0.0.4"
+    )
+
+
 # Callback page navigation
 @app.callback(
     Output("page-content", "children"),
     [
         Input("url", "pathname"),
-        Input("store-input-data", "data"),
-        Input("store-model-charts", "data"),
-        Input("store-model-kpis", "data"),
+        Input("store-model-key", "data"),
     ],
 )
-def render_page_content(pathname, input_data, charts_data, kpis_data):
+def render_page_content(pathname, model_key):
+    if not (model_key and model_cache.exists(model_key)):
+        model_key = None
+
     if pathname == "/":
         return pages["Readme"]["content"].make_layout()
     elif pathname == "/data":
-        return pages["Data"]["content"].make_layout(input_data)
+        return pages["Data"]["content"].make_layout(model_key)
     elif pathname == "/growth":
-        return pages["Growth"]["content"].make_layout(charts_data)
+        return pages["Growth"]["content"].make_layout(model_key)
     elif pathname == "/retention":
-        return pages["Retention"]["content"].make_layout(charts_data)
+        return pages["Retention"]["content"].make_layout(model_key)
     elif pathname == "/churn":
-        return pages["Churn"]["content"].make_layout(charts_data)
+        return pages["Churn"]["content"].make_layout(model_key)
     elif pathname == "/kpis":
+        kpis_data = None
+        if model_key:
+            kpis_data = figure_registry.get_kpis(model_key)
         return pages["KPIs"]["content"].make_layout(kpis_data)
     else:
         return None
 
 
+# Callbacks page tabs, only the figures of the active tab are sent
+@app.callback(
+    Output("tab-content-growth", "children"),
+    Input("tabs-growth", "active_tab"),
+    State("store-model-key", "data"),
+)
+def render_growth_tab(date_range, model_key):
+    charts_data = figure_registry.get_charts(
+        model_key, date_range, ["active_users", "growth_accounting"]
+    )
+    if charts_data is None:
+        return None
+    return pages["Growth"]["content"].make_tab(charts_data)
+
+
+# Callback growth graphs zoom, downsampled figures are replaced by figures of
+# the zoomed dates
+@app.callback(
+    Output({"type": "graph-growth", "name": MATCH}, "figure"),
+    Input({"type": "graph-growth", "name": MATCH}, "relayoutData"),
+    State("tabs-growth", "active_tab"),
+    State("store-model-key", "data"),
+    prevent_initial_call=True,
+)
+def zoom_growth_graph(relayout_data, date_range, model_key):
+    relayout_data = relayout_data or {}
+    if "xaxis.range[0]" in relayout_data:
+        x_range = [relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]]
+    elif "xaxis.range" in relayout_data:
+        x_range = relayout_data["xaxis.range"]
+    elif "xaxis.autorange" in relayout_data:
+        x_range = None
+    else:
+        return no_update
+
+    fig = figure_registry.get_zoomed_chart(
+        model_key, ctx.triggered_id["name"], date_range, x_range
+    )
+    if fig is None:
+        return no_update
+    return pages["Growth"]["content"].make_chart(fig)
+
+
+@app.callback(
+    Output("tab-content-retention", "children"),
+    Input("tabs-retention", "active_tab"),
+    State("store-model-key", "data"),
+)
+def render_retention_tab(date_range, model_key):
+    charts_data = figure_registry.get_charts(model_key, date_range, ["retention"])
+    if charts_data is None:
+        return None
+    return pages["Retention"]["content"].make_tab(charts_data, date_range)
+
+
+@app.callback(
+    Output("tab-content-churn", "children"),
+    Input("tabs-churn", "active_tab"),
+    State("store-model-key", "data"),
+)
+def render_churn_tab(date_range, model_key):
+    charts_data = figure_registry.get_charts(
+        model_key, date_range, ["churn_count", "churn_percentage"]
+    )
+    if charts_data is None:
+        return None
+    return pages["Churn"]["content"].make_tab(charts_data)
+
+
+# Callback data table, only the rows of the current page are sent
+@app.callback(
+    [
+        Output("table-input-data", "data"),
+        Output("table-input-data", "page_count"),
+    ],
+    [
+        Input("table-input-data", "page_current"),
+        Input("table-input-data", "page_size"),
+        Input("table-input-data", "sort_by"),
+        Input("table-input-data", "filter_query"),
+    ],
+    State("store-model-key", "data"),
+)
+def render_data_table(page_current, page_size, sort_by, filter_query, model_key):
+    model = model_cache.load(model_key)
+    if model is None:
+        return [[], 0]
+    try:
+        input_data, nb_rows = model.get_input_data_page(
+            get_table_filters(filter_query),
+            sort_by,
+            page_current,
+            page_size,
+        )
+    except ValueError as e:
+        print(f"> Invalid data table query: {e}")
+        return [[], 0]
+    return [
+        pages["Data"]["content"].make_table_data(input_data),
+        -(-nb_rows // page_size),
+    ]
+
+
+@metrics.instrument("fit_model")
+def fit_model(upload_id, model_key, progress):
+    # Run by a job process, the model is handed back through the model cache
+    filename = upload_store.get_filename(upload_id)
+    progress("hashing data")
+    content_hash = get_file_hash(filename)
+
+    # Cached model of the same file and day, or of a previous day
+    model = model_cache.get(content_hash, datetime.today().date())
+    if model is None:
+        model, _ = model_cache.get_latest(content_hash)
+        if model is not None:
+            progress("updating model up to today")
+            model = copy.copy(model)
+            model.update(progress=progress)
+
+    if model is None:
+        # Load data
+        dataset, errors = read_subscriptions(
+            filename, engine=INGESTION_ENGINE, progress=progress
+        )
+        if len(errors) > 0:
+            raise Exception(get_errors_message(errors))
+
+        # Create data model, or update the previous model of this session (a
+        # copy, as other sessions may use it)
+        delta = None
+        previous_model = model_cache.load(model_key)
+        if previous_model is not None:
+            model = copy.copy(previous_model)
+            delta = model.get_delta(dataset)
+        if delta is None:
+            # Aggregates computed when first displayed, or fitted here in
+            # parallel processes when worth their start up time
+            model = DataModel(dataset)
+            if len(dataset) >= FIT_PARALLEL_ROWS:
+                model.fit(progress, n_jobs=FIT_PROCESSES)
+        else:
+            progress(f"updating model with {len(delta)} subscriptions")
+            model.update(delta, progress)
+
+    # Intervals of activity, so that KPIs are displayed without aggregates
+    progress("indexing activity")
+    model.intervals()
+
+    # Export model
+    progress("saving model")
+    model_key = model_cache.put(model, content_hash)
+    upload_store.remove(upload_id)
+    return model_key
+
+
+# Callback uploaded file, set by assets/upload.js
+app.clientside_callback(
+    "function(n_clicks) { return window.uploadedFile; }",
+    Output("store-upload", "data"),
+    Input("button-upload-done", "n_clicks"),
+    prevent_initial_call=True,
+)
+
+
 # Callback load data
 @app.callback(
     [
-        Output("store-input-data", "data"),
-        Output("store-model-charts", "data"),
-        Output("store-model-kpis", "data"),
+        Output("store-model-key", "data"),
+        Output("store-job", "data"),
+        Output("interval-job", "disabled"),
         Output("button-load-data", "value"),
         Output("output-load-data", "children"),
     ],
-    Input("upload-file", "contents"),
-    Input("upload-file", "filename"),
+    Input("store-upload", "data"),
+    State("store-model-key", "data"),
 )
-def load_data(content, filename):
-    if content is None:
+@metrics.instrument("load_data")
+def load_data(upload, model_key):
+    if upload is None:
         try:
-            # Load data
-            print(f"> Loading data")
-            filename = "data/dataset.csv"
-            dataset = pd.read_csv(filename)
-            dataset["start_date"] = pd.to_datetime(dataset["start_date"])
-            dataset["end_date"] = pd.to_datetime(dataset["end_date"])
-
-            # Load or create charts
-            print(f"> Loading charts")
-
-            # Load existing data
-            with open("figures/fig_dict.json", "r") as f:
-                fig_dict = json.load(f)
-            for date_range in fig_dict:
-                for fig in fig_dict[date_range]:
-                    if type(fig_dict[date_range][fig]) == list:
-                        fig_dict[date_range][fig] = [
-                            go.Figure(json.loads(x)) for x in fig_dict[date_range][fig]
-                        ]
-                    else:
-                        fig_dict[date_range][fig] = go.Figure(
-                            json.loads(fig_dict[date_range][fig])
-                        )
-            with open("figures/fig_kpis.json", "r") as f:
-                fig_kpis = json.load(f)
-                for kpi in fig_kpis:
-                    fig_kpis[kpi] = go.Figure(json.loads(fig_kpis[kpi]))
-            print(f"> Existing charts loaded!")
-            return [
-                dataset.to_json(date_format="iso", orient="split"),
-                fig_dict,
-                fig_kpis,
-                "Load data",
-                True,
-            ]
+            # Load most recently used model
+            print(f"> Loading model")
+            model, content_hash = model_cache.get_latest()
+            if model is None:
+                raise Exception("no cached model")
+
+            # Advance a model fitted on a previous day up to today
+            if get_as_of(model) < datetime.today().date():
+                print(f"> Updating model up to today")
+                model = copy.copy(model)
+                model.update()
+            model_key = model_cache.put(model, content_hash)
+            print(f"> Existing model loaded!")
         except Exception as e:
-            print(f"> Not loading existing charts: {e}")
-            return [None, None, None, "Load data", False]
+            print(f"> Not loading existing model: {e}")
+            return [None, None, True, "Load data", False]
     else:
-        _, content_string = content.split(",")
-        decoded = base64.b64decode(content_string)
-        if ".csv" not in filename:
+        if ".csv" not in upload["filename"]:
             raise Exception("File is not a .csv")
+        elif upload_store.get_size(upload["upload_id"]) != upload["size"]:
+            raise Exception("File is not completely uploaded")
         else:
-            # Load data
-            dataset = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
-            dataset["start_date"] = pd.to_datetime(dataset["start_date"])
-            dataset["end_date"] = pd.to_datetime(dataset["end_date"])
+            # Fit in the background
+            print(f"> Submitting model job")
+            job_id = job_runner.submit(fit_model, upload["upload_id"], model_key)
+            return [no_update, job_id, False, "Load data", no_update]
 
-            # Create data model
-            print(f"> Fitting model")
-            model = DataModel(dataset)
-            model.fit()
-
-            # Get charts
-            print(f"> Creating charts")
-            fig_dict = {}
-            for date_range in model.date_range_dict.keys():
-                fig_dict[date_range] = model.get_charts(date_range)
-            fig_kpis = model.get_kpis()
-
-            # Export data
-            print(f"> Exporting charts")
-            fig_dict_json = {}
-            for date_range in fig_dict:
-                fig_dict_json[date_range] = {}
-                for fig in fig_dict[date_range]:
-                    if type(fig_dict[date_range][fig]) == list:
-                        fig_dict_json[date_range][fig] = [
-                            x.to_json() for x in fig_dict[date_range][fig]
-                        ]
-                    else:
-                        fig_dict_json[date_range][fig] = fig_dict[date_range][
-                            fig
-                        ].to_json()
-            fig_kpis_json = {}
-            for kpi in fig_kpis:
-                fig_kpis_json[kpi] = fig_kpis[kpi].to_json()
-
-            with open("figures/fig_dict.json", "w") as f:
-                json.dump(fig_dict_json, f)
-            with open("figures/fig_kpis.json", "w") as f:
-                json.dump(fig_kpis_json, f)
-
-            return [
-                dataset.to_json(date_format="iso", orient="split"),
-                fig_dict,
-                fig_kpis,
-                "Load data",
-                True,
-            ]
+    return [model_key, None, True, "Load data", True]
+
+
+# Callback job progress
+@app.callback(
+    [
+        Output("store-model-key", "data", allow_duplicate=True),
+        Output("interval-job", "disabled", allow_duplicate=True),
+        Output("output-load-data", "children", allow_duplicate=True),
+        Output("output-job-progress", "children"),
+    ],
+    Input("interval-job", "n_intervals"),
+    State("store-job", "data"),
+    prevent_initial_call=True,
+)
+def poll_job(n_intervals, job_id):
+    status = job_runner.get_status(job_id) if job_id else None
+    if status is None:
+        return [no_update, True, no_update, None]
+    elif status["state"] == "done":
+        return [status["result"], True, True, None]
+    elif status["state"] == "failed":
+        return [no_update, True, no_update, f"⚠️ Failed: {status['stage']}"]
+    else:
+        return [no_update, False, no_update, f"⏳ {status['stage'].capitalize()}..."]
 
 
 # Callback load data modal
@@ -0,0 +1,91 @@
+// Chunked upload of the selected file to the server, an interrupted upload
+// of the same file resumes from the size already received
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 3;
+
+function getUploadId(file) {
+    // Same ID for the same file
+    const key = `${file.name}-${file.size}-${file.lastModified}`;
+    let hash = 0;
+    for (let i = 0; i < key.length; i++) {
+        hash = (Math.imul(31, hash) + key.charCodeAt(i)) | 0;
+    }
+    return [hash >>> 0, file.size, file.lastModified]
+        .map((x) => x.toString(16))
+        .join("-");
+}
+
+function setUploadProgress(text) {
+    const element = document.getElementById("output-job-progress");
+    if (element) {
+        element.textContent = text;
+    }
+}
+
+async function getUploadSize(url) {
+    const response = await fetch(url);
+    return (await response.json()).size;
+}
+
+async function uploadFile(file) {
+    const uploadId = getUploadId(file);
+    const url = `/upload/${uploadId}`;
+
+    let offset = await getUploadSize(url);
+    let retries = 0;
+    while (offset < file.size) {
+        setUploadProgress(
+            `⏳ Uploading ${Math.floor((100 * offset) / file.size)}%...`
+        );
+        try {
+            const response = await fetch(`${url}?offset=${offset}`, {
+                method: "POST",
+                body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+            });
+            // Conflict when the server has another size, resume from there
+            if (!response.ok && response.status !== 409) {
+                throw new Error(response.statusText);
+            }
+            offset = (await response.json()).size;
+            retries = 0;
+        } catch (error) {
+            retries += 1;
+            if (retries > UPLOAD_RETRIES) {
+                throw error;
+            }
+            offset = await getUploadSize(url);
+        }
+    }
+    setUploadProgress("");
+    return uploadId;
+}
+
+async function onFileSelected(file) {
+    try {
+        const uploadId = await uploadFile(file);
+
+        // Read by a clientside callback into the upload store
+        window.uploadedFile = {
+            upload_id: uploadId,
+            filename: file.name,
+            size: file.size,
+        };
+        document.getElementById("button-upload-done").click();
+    } catch (error) {
+        setUploadProgress(`⚠️ Upload failed: ${error.message}`);
+    }
+}
+
+document.addEventListener("click", (event) => {
+    if (event.target.closest("#button-load-data")) {
+        const input = document.createElement("input");
+        input.type = "file";
+        input.accept = ".csv";
+        input.addEventListener("change", () => {
+            if (input.files.length) {
+                onFileSelected(input.files[0]);
+            }
+        });
+        input.click();
+    }
+});
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.data import DataGenerator
+from utils.ingestion import read_subscriptions
+
+
+def read_subscriptions_legacy(filename):
+    # Inferred types and dates parsed afterwards as previously done in
+    # app.load_data
+    dataset = pd.read_csv(filename)
+    dataset["start_date"] = pd.to_datetime(dataset["start_date"])
+    dataset["end_date"] = pd.to_datetime(dataset["end_date"])
+    return dataset
+
+
+def run(number_users, min_start_date, max_end_date):
+    # Data
+    generator = DataGenerator(number_users, min_start_date, max_end_date)
+    generator.create_dataset()
+
+    with tempfile.TemporaryDirectory() as path:
+        filename = os.path.join(path, "dataset.csv")
+        generator.export_csv(filename)
+
+        # Legacy
+        start = time.perf_counter()
+        legacy = read_subscriptions_legacy(filename)
+        time_legacy = time.perf_counter() - start
+        memory_legacy = legacy.memory_usage(deep=True).sum() / 1024**2
+        print(
+            f"> {number_users} users, legacy: {time_legacy:.2f}s, {memory_legacy:.0f}MB"
+        )
+
+        # Typed, with each engine
+        for engine in ["c", "pyarrow"]:
+            start = time.perf_counter()
+            dataset, errors = read_subscriptions(filename, engine=engine)
+            time_typed = time.perf_counter() - start
+            memory_typed = dataset.memory_usage(deep=True).sum() / 1024**2
+
+            # Same data
+            assert len(errors) == 0
+            pd.testing.assert_frame_equal(
+                legacy, dataset.astype({"user_id": str, "subscription_id": str})
+            )
+
+            print(
+                f"> {number_users} users, typed ({engine}): {time_typed:.2f}s, "
+                f"{memory_typed:.0f}MB, speedup x{time_legacy / time_typed:.1f}"
+            )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+
+    # Benchmarks
+    run(100_000, START_DATE, END_DATE)
+    run(1_000_000, START_DATE, END_DATE)
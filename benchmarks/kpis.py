@@ -0,0 +1,42 @@
+import time
+from datetime import datetime
+
+from utils.data import DataGenerator
+from utils.model import DataModel
+
+
+def run(number_users, min_start_date, max_end_date):
+    # Data
+    generator = DataGenerator(number_users, min_start_date, max_end_date)
+    generator.create_dataset()
+
+    # KPIs from intervals of activity, right after load
+    model = DataModel(generator.dataset)
+    start = time.perf_counter()
+    model.intervals()
+    time_index = time.perf_counter() - start
+    start = time.perf_counter()
+    kpis = model.get_kpis()
+    time_kpis = time.perf_counter() - start
+
+    # Aggregates of all date ranges, previously needed for KPIs
+    start = time.perf_counter()
+    model.fit()
+    time_fit = time.perf_counter() - start
+
+    print(
+        f"> {number_users} users ({len(generator.dataset)} subscriptions): "
+        f"intervals {time_index:.2f}s, KPIs {1000 * time_kpis:.1f}ms, "
+        f"fit {time_fit:.2f}s, active users now {kpis['active_users_now'].data[0].value}"
+    )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+
+    # Benchmarks
+    for number_users in [10_000, 100_000]:
+        run(number_users, START_DATE, END_DATE)
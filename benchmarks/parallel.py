@@ -0,0 +1,58 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.data import DataGenerator
+from utils.model import DataModel
+
+
+def run(number_users, min_start_date, max_end_date, n_jobs):
+    # Data
+    generator = DataGenerator(number_users, min_start_date, max_end_date)
+    generator.create_dataset()
+
+    # Sequential
+    sequential = DataModel(generator.dataset)
+    start = time.perf_counter()
+    sequential.fit()
+    time_sequential = time.perf_counter() - start
+
+    # Parallel
+    parallel = DataModel(generator.dataset, max_end_date=sequential.max_end_date)
+    start = time.perf_counter()
+    parallel.fit(n_jobs=n_jobs)
+    time_parallel = time.perf_counter() - start
+
+    # Same model
+    for date_range in sequential.date_range_dict:
+        pd.testing.assert_frame_equal(
+            sequential.activity_runs_dict[date_range],
+            parallel.activity_runs_dict[date_range],
+        )
+        pd.testing.assert_frame_equal(
+            sequential.active_user_data_aggregated_dict[date_range],
+            parallel.active_user_data_aggregated_dict[date_range],
+        )
+        np.testing.assert_array_equal(
+            sequential.retention_count_dict[date_range][0],
+            parallel.retention_count_dict[date_range][0],
+        )
+
+    print(
+        f"> {number_users} users ({len(generator.dataset)} subscriptions): "
+        f"sequential {time_sequential:.2f}s, {n_jobs} processes {time_parallel:.2f}s, "
+        f"speedup x{time_sequential / time_parallel:.1f}"
+    )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+
+    # Benchmarks
+    run(500_000, START_DATE, END_DATE, os.cpu_count())
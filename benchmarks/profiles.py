@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+
+from utils.data import PROFILES, DataGenerator
+from utils.model import DataModel
+
+
+def run(profile, number_users, min_start_date, max_end_date, today, seed):
+    # Data, the same at each run
+    generator = DataGenerator(
+        number_users,
+        min_start_date,
+        max_end_date,
+        seed=seed,
+        profile=profile,
+        today=today,
+    )
+    start = time.perf_counter()
+    generator.create_dataset()
+    time_data = time.perf_counter() - start
+    dataset = generator.dataset
+
+    # Model
+    start = time.perf_counter()
+    model = DataModel(dataset)
+    model.fit()
+    time_fit = time.perf_counter() - start
+    start = time.perf_counter()
+    for date_range in model.date_range_dict:
+        model.get_charts(date_range)
+    time_charts = time.perf_counter() - start
+    start = time.perf_counter()
+    model.kpis()
+    time_kpis = time.perf_counter() - start
+
+    active_users = model.active_users("month")
+    print(
+        f"> {profile}, {number_users} users ({len(dataset)} subscriptions, "
+        f"{dataset['end_date'].isna().mean():.0%} open-ended, "
+        f"{active_users['resurrected'].sum()} resurrected by month): "
+        f"data {time_data:.2f}s, fit {time_fit:.2f}s, charts {time_charts:.2f}s, "
+        f"KPIs {time_kpis:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+    TODAY = datetime(2024, 7, 1, 12)
+    SEED = 0
+
+    # Benchmarks
+    for profile in PROFILES:
+        for number_users in [10_000, 100_000]:
+            run(profile, number_users, START_DATE, END_DATE, TODAY, SEED)
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.data import DataGenerator
+from utils.model import DataModel
+
+
+def get_retention_curves_legacy(model, date_range):
+    # Padding with one concatenation per cohort and period as previously done
+    # in DataModel.get_charts
+    retention_data = model.get_retention_data(date_range)
+    retention_data = retention_data.loc[
+        :, [f"start_{date_range}", date_range, "is_active"]
+    ]
+    for start_date_range in pd.unique(retention_data[f"start_{date_range}"]):
+        for d in model.date_range_dict[date_range]:
+            retention_data = pd.concat(
+                [
+                    retention_data,
+                    pd.DataFrame(
+                        [[start_date_range, d, 0]],
+                        columns=retention_data.columns,
+                    ),
+                ],
+                axis=0,
+            )
+    retention_data = (
+        retention_data.groupby([f"start_{date_range}", date_range])["is_active"]
+        .sum()
+        .reset_index()
+        .sort_values([f"start_{date_range}", date_range])
+        .rename(columns={"is_active": "number_active_users"})
+    )
+    retention_data.loc[
+        retention_data[f"start_{date_range}"] == retention_data[date_range],
+        "number_active_users",
+    ] = 0
+    return retention_data
+
+
+def run(number_users, min_start_date, max_end_date, date_range):
+    # Data
+    generator = DataGenerator(number_users, min_start_date, max_end_date)
+    generator.create_dataset()
+    model = DataModel(generator.dataset)
+    model.fit()
+
+    # Legacy
+    start = time.perf_counter()
+    legacy = get_retention_curves_legacy(model, date_range)
+    time_legacy = time.perf_counter() - start
+
+    # Cohort matrix
+    start = time.perf_counter()
+    curves = model.get_retention_curves(date_range)
+    time_curves = time.perf_counter() - start
+
+    # Same curves
+    pd.testing.assert_frame_equal(
+        legacy.reset_index(drop=True), curves, check_dtype=False
+    )
+
+    print(
+        f"> {number_users} users, {date_range} ({len(curves)} points): "
+        f"legacy {time_legacy:.2f}s, cohort matrix {time_curves:.4f}s, "
+        f"speedup x{time_legacy / time_curves:.0f}"
+    )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+
+    # Benchmarks
+    run(1_000, START_DATE, END_DATE, "month")
+    run(1_000, START_DATE, END_DATE, "week")
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.activity import get_period_runs, get_runs_dense, get_dense_status, STATUS
+from utils.data import DataGenerator
+from utils.model import DataModel
+
+
+def get_status_legacy(active_user_data_date_range):
+    # Row-wise status classification as previously done in DataModel.fit
+    active_user_data_date_range["is_active_previous"] = (
+        active_user_data_date_range.groupby("user_id")["is_active"].shift(
+            1, fill_value=0
+        )
+    )
+    active_user_data_date_range["was_active"] = active_user_data_date_range.groupby(
+        "user_id"
+    )["is_active"].cumsum()
+    active_user_data_date_range["was_active"] = active_user_data_date_range[
+        "was_active"
+    ].apply(lambda x: 1 if x > 1 else 0)
+    active_user_data_date_range["status"] = active_user_data_date_range.apply(
+        lambda x: (
+            "new_active"
+            if x["is_active"] == 1
+            and x["is_active_previous"] == 0
+            and x["was_active"] == 0
+            else (
+                "resurrected"
+                if x["is_active"] == 1
+                and x["is_active_previous"] == 0
+                and x["was_active"] == 1
+                else (
+                    "churn"
+                    if x["is_active"] == 0 and x["is_active_previous"] == 1
+                    else None
+                )
+            )
+        ),
+        axis=1,
+    )
+    return active_user_data_date_range
+
+
+def get_status_counts(data, date_range):
+    return (
+        pd.crosstab(data[date_range], data["status"].astype(str))
+        .reindex(columns=STATUS, fill_value=0)
+        .astype(np.int64)
+    )
+
+
+def get_active_user_data(model, date_range):
+    # Activity of each user in each period, one row per user and period
+    data = model.dataset.copy()
+    data["end_date"] = data["end_date"].fillna(model.max_end_date)
+    user_codes, users = data["user"].values, model.users
+    periods = pd.DatetimeIndex(model.date_range_dict[date_range]).values
+    runs = get_period_runs(
+        user_codes, data["start_date"].values, data["end_date"].values, periods
+    )
+    is_active = get_runs_dense(runs, len(users), len(periods))
+    active_user_data_date_range = pd.DataFrame(
+        {
+            date_range: np.repeat(periods, len(users)),
+            "user_id": np.tile(users, len(periods)),
+            "is_active": is_active.ravel().astype(np.int64),
+        }
+    )
+    return active_user_data_date_range, is_active
+
+
+def run(number_users, min_start_date, max_end_date, date_range, profile):
+    # Data, with users subscribing again so that all statuses are compared
+    generator = DataGenerator(
+        number_users, min_start_date, max_end_date, profile=profile
+    )
+    generator.create_dataset()
+    model = DataModel(generator.dataset)
+    active_user_data_date_range, is_active = get_active_user_data(model, date_range)
+
+    # Legacy
+    start = time.perf_counter()
+    legacy = get_status_legacy(active_user_data_date_range.copy())
+    time_legacy = time.perf_counter() - start
+
+    # Vectorized
+    start = time.perf_counter()
+    vectorized = active_user_data_date_range.copy()
+    _, _, vectorized["status"] = get_dense_status(is_active)
+    time_vectorized = time.perf_counter() - start
+
+    # Same counts per period
+    pd.testing.assert_frame_equal(
+        get_status_counts(legacy, date_range),
+        get_status_counts(vectorized, date_range),
+    )
+
+    print(
+        f"> {number_users} users, {date_range} ({len(active_user_data_date_range)} rows): "
+        f"legacy {time_legacy:.2f}s, vectorized {time_vectorized:.4f}s, "
+        f"speedup x{time_legacy / time_vectorized:.0f}"
+    )
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    START_DATE = datetime(2022, 1, 1)
+    END_DATE = datetime(2025, 1, 1)
+
+    # Benchmarks
+    run(1_000, START_DATE, END_DATE, "week", "seasonal")
+    run(100_000, START_DATE, END_DATE, "month", "seasonal")
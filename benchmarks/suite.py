@@ -0,0 +1,220 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from unittest import mock
+
+import plotly.utils
+
+import app
+from utils.cache import ModelCache
+from utils.data import PROFILES, DataGenerator
+from utils.metrics import metrics
+from utils.model import DataModel
+from utils.upload import UploadStore
+
+# Data of the benchmarks, the same at each run, generated during the day as
+# uploaded data (dates from today are known)
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2025, 1, 1)
+TODAY = datetime(2024, 7, 1, 12)
+DATE_RANGES = ["day", "week", "month"]
+UPLOAD_ID = "benchmark"
+
+
+class BenchmarkDatetime(datetime):
+    # Today of the app and the model as the date of the data, so that models
+    # have the same periods at each run
+    @classmethod
+    def today(cls):
+        return TODAY
+
+
+def measure(function, setup=None, repeat=3):
+    # Best wall time of a few runs, each from a fresh setup (not timed), and
+    # peak memory allocated by Python, NumPy and pandas in another run (Arrow
+    # buffers are not traced)
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"time": min(times), "times": times, "peak_memory": peak_memory}
+
+
+def get_cases(dataset, filename, path):
+    # Cases as (name, function, setup), models with the same periods at each run
+    max_end_date = TODAY + timedelta(days=1)
+
+    def get_model():
+        return (DataModel(dataset, max_end_date=max_end_date),)
+
+    def get_fitted_model(date_range):
+        model = DataModel(dataset, max_end_date=max_end_date)
+        model.fit(date_ranges=[date_range])
+        return (model,)
+
+    def get_indexed_model():
+        model = DataModel(dataset, max_end_date=max_end_date)
+        model.intervals()
+        return (model,)
+
+    # Path of the app: upload fitted by the job (no cached model), up to the
+    # figures of the first pages as sent to the browser, then cached model
+    # loaded from disk by a new app process
+    model_path = os.path.join(path, "models")
+
+    def get_upload():
+        shutil.rmtree(model_path, ignore_errors=True)
+        app.model_cache = ModelCache(model_path, app.MODEL_CACHE_SIZE)
+        app.figure_registry.model_cache = app.model_cache
+        shutil.copyfile(filename, app.upload_store.get_filename(UPLOAD_ID))
+        return (UPLOAD_ID, None, lambda stage: None)
+
+    def load_figures(upload_id, model_key, progress):
+        model_key = app.fit_model(upload_id, model_key, progress)
+        for content in [
+            app.render_page_content("/kpis", model_key),
+            app.render_page_content("/growth", model_key),
+            app.render_growth_tab("month", model_key),
+        ]:
+            assert content is not None
+            json.dumps(content, cls=plotly.utils.PlotlyJSONEncoder)
+
+    def get_cache():
+        app.model_cache = ModelCache(model_path, app.MODEL_CACHE_SIZE)
+        app.figure_registry.model_cache = app.model_cache
+        return (None, None)
+
+    cases = [("init", lambda: DataModel(dataset, max_end_date=max_end_date), None)]
+    for date_range in DATE_RANGES:
+        cases.append(
+            (
+                f"fit_{date_range}",
+                lambda model, date_range=date_range: model.fit(
+                    date_ranges=[date_range]
+                ),
+                get_model,
+            )
+        )
+    for date_range in DATE_RANGES:
+        cases.append(
+            (
+                f"charts_{date_range}",
+                lambda model, date_range=date_range: model.get_charts(date_range),
+                lambda date_range=date_range: get_fitted_model(date_range),
+            )
+        )
+    cases.append(("kpis", lambda model: model.get_kpis(), get_indexed_model))
+    cases.append(("load_data_upload", app.fit_model, get_upload))
+    cases.append(("load_data_figures", load_figures, get_upload))
+    cases.append(("load_data_cached", app.load_data, get_cache))
+    return cases
+
+
+def run(sizes, profile, seed, repeat):
+    report = {
+        "metadata": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": profile,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as path, mock.patch(
+        "app.datetime", BenchmarkDatetime
+    ), mock.patch("utils.model.datetime", BenchmarkDatetime):
+        # Stage metrics of the app kept with the other files of the benchmarks
+        metrics.path = os.path.join(path, "metrics")
+        logging.getLogger("utils.metrics").setLevel(logging.WARNING)
+        app.upload_store = UploadStore(os.path.join(path, "uploads"))
+        os.makedirs(app.upload_store.path)
+
+        for number_users in sizes:
+            # Data, as uploaded and as read
+            generator = DataGenerator(
+                number_users,
+                START_DATE,
+                END_DATE,
+                seed=seed,
+                profile=profile,
+                today=TODAY,
+            )
+            filename = os.path.join(path, "dataset.csv")
+            generator.export_csv(filename)
+            generator.create_dataset()
+
+            for name, function, setup in get_cases(generator.dataset, filename, path):
+                result = measure(function, setup, repeat)
+                result["rows"] = len(generator.dataset)
+                report["results"][f"{number_users}/{name}"] = result
+                print(
+                    f"> {number_users} users, {name}: {result['time']:.3f}s, "
+                    f"peak memory {result['peak_memory'] / 1024**2:.1f}MB"
+                )
+    return report
+
+
+def compare(report, baseline, threshold):
+    # Cases slower or using more memory than the baseline beyond the threshold
+    regressions = []
+    for key, result in report["results"].items():
+        if key not in baseline["results"]:
+            continue
+        for metric in ["time", "peak_memory"]:
+            ratio = result[metric] / max(baseline["results"][key][metric], 1e-9)
+            if ratio > 1 + threshold:
+                regressions.append((key, metric, ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+
+    # Parameters
+    parser = argparse.ArgumentParser(description="Benchmarks of the model")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--profile", choices=list(PROFILES), default="uniform")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="report to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Benchmarks
+    report = run(args.sizes, args.profile, args.seed, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"> Report written to {args.output}")
+
+    # Comparison
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for key, metric, ratio in regressions:
+            print(f"> Regression {key} {metric}: x{ratio:.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"> No regression above {args.threshold:.0%}")
@@ -1,63 +1,44 @@
 from dash import dcc, html
-import dash_bootstrap_components as dbc
 
-from utils.dash import get_please_load_data_message, DashboardColors
+from utils.dash import get_please_load_data_message, get_tabs, DashboardColors
 
 title = "Churn"
 
 
-def make_layout(charts_data):
-    if not charts_data:
+def make_layout(model_key):
+    if not model_key:
         return html.Div([html.H2(title), get_please_load_data_message()])
     else:
-        for date_range in ["month", "week"]:
-            charts_data[date_range]["churn_count"]["layout"]["height"] = 400
-            charts_data[date_range]["churn_percentage"]["layout"]["height"] = 400
-            charts_data[date_range]["churn_percentage"]["layout"]["height"] = 400
         return html.Div(
             [
                 html.H2(title),
-                dbc.CardHeader(
-                    dbc.Tabs(
-                        [
-                            dbc.Tab(
-                                dcc.Loading(
-                                    type="circle",
-                                    color=DashboardColors.gray,
-                                    children=html.Div(
-                                        [
-                                            html.Br(),
-                                            dcc.Graph(
-                                                figure=charts_data[date_range][
-                                                    "churn_count"
-                                                ],
-                                                style={
-                                                    "border-radius": "15px",
-                                                    "background-color": DashboardColors.white,
-                                                },
-                                                config={"displayModeBar": False},
-                                            ),
-                                            html.Br(),
-                                            dcc.Graph(
-                                                figure=charts_data[date_range][
-                                                    "churn_percentage"
-                                                ],
-                                                style={
-                                                    "border-radius": "15px",
-                                                    "background-color": DashboardColors.white,
-                                                },
-                                                config={"displayModeBar": False},
-                                            ),
-                                        ]
-                                    ),
-                                ),
-                                label=date_range.capitalize(),
-                                tab_id=date_range,
-                            )
-                            for date_range in ["month", "week"]
-                        ],
-                        active_tab="month",
-                    )
-                ),
+                get_tabs("churn", ["month", "week"]),
             ]
         )
+
+
+def make_tab(charts_data):
+    charts_data["churn_count"].update_layout(height=400)
+    charts_data["churn_percentage"].update_layout(height=400)
+    return html.Div(
+        [
+            html.Br(),
+            dcc.Graph(
+                figure=charts_data["churn_count"],
+                style={
+                    "border-radius": "15px",
+                    "background-color": DashboardColors.white,
+                },
+                config={"displayModeBar": False},
+            ),
+            html.Br(),
+            dcc.Graph(
+                figure=charts_data["churn_percentage"],
+                style={
+                    "border-radius": "15px",
+                    "background-color": DashboardColors.white,
+                },
+                config={"displayModeBar": False},
+            ),
+        ]
+    )
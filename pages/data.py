@@ -1,38 +1,44 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
-import pandas as pd
 
-from utils.dash import get_please_load_data_message, get_table
+from utils.dash import get_please_load_data_message, get_query_table
 
+# Columns of the input data table, IDs as text and dates filtered by prefix
+columns = [
+    {"name": "User id", "id": "user_id", "type": "text"},
+    {"name": "Subscription id", "id": "subscription_id", "type": "text"},
+    {"name": "Start date", "id": "start_date", "type": "datetime"},
+    {"name": "End date", "id": "end_date", "type": "datetime"},
+]
 
-def make_layout(input_data):
-    if not input_data:
+
+def make_layout(model_key):
+    if not model_key:
         return html.Div([html.H2("Data"), get_please_load_data_message()])
     else:
-
-        input_data = pd.read_json(input_data, orient="split")
-
-        input_data["start_date"] = input_data["start_date"].apply(
-            lambda x: pd.to_datetime(x).strftime("%Y-%m-%d")
-        )
-        input_data["end_date"] = input_data["end_date"].apply(
-            lambda x: (pd.to_datetime(x).strftime("%Y-%m-%d") if x != None else None)
-        )
-
-        input_data.columns = [
-            c.replace("_", " ").capitalize() for c in input_data.columns
-        ]
-
         return html.Div(
             [
                 html.H2("Data"),
                 html.Div(
                     [
                         html.H4("Input data"),
-                        get_table(input_data, filter_action="none"),
+                        get_query_table("table-input-data", columns),
                     ],
                     className="div-white-border-radius",
                     style={"padding": "20px"},
                 ),
             ]
         )
+
+
+def make_table_data(input_data):
+    # Rows of a page, with dates formatted and empty end dates
+    input_data = input_data.copy()
+    for c in ["start_date", "end_date"]:
+        input_data[c] = (
+            input_data[c]
+            .dt.strftime("%Y-%m-%d")
+            .astype(object)
+            .where(input_data[c].notna(), None)
+        )
+    return input_data.to_dict("records")
@@ -1,64 +1,50 @@
 from dash import dcc, html
-import dash_bootstrap_components as dbc
 
-from utils.dash import get_please_load_data_message, DashboardColors
+from utils.dash import get_please_load_data_message, get_tabs, DashboardColors
 
 title = "Growth"
 
 
-def make_layout(charts_data):
-    if not charts_data:
+def make_layout(model_key):
+    if not model_key:
         return html.Div([html.H2(title), get_please_load_data_message()])
     else:
-        for date_range in ["month", "week", "day"]:
-            charts_data[date_range]["active_users"]["layout"]["height"] = 400
-            charts_data[date_range]["growth_accounting"]["layout"]["height"] = 400
         return html.Div(
             [
                 html.H2(title),
-                dbc.CardHeader(
-                    dbc.Tabs(
-                        [
-                            dbc.Tab(
-                                dcc.Loading(
-                                    type="circle",
-                                    color=DashboardColors.gray,
-                                    children=html.Div(
-                                        [
-                                            html.Br(),
-                                            dcc.Graph(
-                                                figure=charts_data[date_range][
-                                                    "active_users"
-                                                ],
-                                                style={
-                                                    "border-radius": "15px",
-                                                    "background-color": DashboardColors.white,
-                                                },
-                                                config={"displayModeBar": False},
-                                            ),
-                                            html.Br(),
-                                            dcc.Graph(
-                                                figure=charts_data[date_range][
-                                                    "growth_accounting"
-                                                ],
-                                                style={
-                                                    "border-radius": "15px",
-                                                    "background-color": DashboardColors.white,
-                                                },
-                                                config={"displayModeBar": False},
-                                            ),
-                                        ]
-                                    ),
-                                ),
-                                label=date_range.capitalize(),
-                                tab_id=date_range,
-                                # active_tab_style={"background-color": DashboardColors.background_gray},
-                                # tab_style={"background-color": DashboardColors.background_gray}
-                            )
-                            for date_range in ["month", "week", "day"]
-                        ],
-                        active_tab="month",
-                    )
-                ),
+                get_tabs("growth", ["month", "week", "day"]),
             ]
         )
+
+
+def make_chart(figure):
+    figure.update_layout(height=400)
+    return figure
+
+
+def make_tab(charts_data):
+    # Graphs zoomed by a callback on their relayout data
+    return html.Div(
+        [
+            html.Br(),
+            dcc.Graph(
+                id={"type": "graph-growth", "name": "active_users"},
+                figure=make_chart(charts_data["active_users"]),
+                style={
+                    "border-radius": "15px",
+                    "background-color": DashboardColors.white,
+                },
+                config={"displayModeBar": False},
+            ),
+            html.Br(),
+            dcc.Graph(
+                id={"type": "graph-growth", "name": "growth_accounting"},
+                figure=make_chart(charts_data["growth_accounting"]),
+                style={
+                    "border-radius": "15px",
+                    "background-color": DashboardColors.white,
+                },
+                config={"displayModeBar": False},
+            ),
+        ]
+    )
@@ -11,8 +11,9 @@ def make_layout(kpis_data):
         return html.Div([html.H2(title), get_please_load_data_message()])
     else:
         for kpi in kpis_data:
-            kpis_data[kpi]["layout"]["height"] = 150
-            kpis_data[kpi]["layout"]["margin"] = {"l": 30, "r": 30, "b": 30, "t": 50}
+            kpis_data[kpi].update_layout(
+                height=150, margin={"l": 30, "r": 30, "b": 30, "t": 50}
+            )
         return dcc.Loading(
             type="circle",
             color=DashboardColors.gray,
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+
+from utils.data import DataGenerator
+from utils.ingestion import read_subscriptions
+from utils.metrics import metrics
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_read_subscriptions_stage(tmp_path, engine):
+    # One stage per read, with the rows of the dataset out
+    filename = tmp_path / "dataset.csv"
+    generator = DataGenerator(
+        2000,
+        datetime(2022, 1, 1),
+        datetime(2025, 1, 1),
+        seed=0,
+        profile="subscription",
+        today=datetime(2024, 7, 1, 12),
+    )
+    generator.export_csv(filename)
+
+    records = []
+    metrics.add_handler(records.append)
+    try:
+        dataset, errors = read_subscriptions(filename, engine=engine, chunksize=500)
+    finally:
+        metrics.handlers.remove(records.append)
+
+    stages = [x for x in records if x["stage"] == "read_subscriptions"]
+    assert len(stages) == 1
+    assert stages[0]["rows_out"] == len(dataset) > 2000
+    assert len(errors) == 0
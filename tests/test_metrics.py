@@ -0,0 +1,31 @@
+import json
+
+from utils.metrics import Metrics
+
+
+def test_totals_of_ended_processes_merged(tmp_path):
+    # Totals of a process that ended, merged into the file of this process
+    totals = {
+        "runs": 2,
+        "errors": 0,
+        "wall_time": 1.0,
+        "cpu_time": 0.5,
+        "rows_in": 10,
+        "rows_out": 5,
+        "peak_rss": 100,
+    }
+    key = json.dumps({"stage": "fit"})
+    with open(tmp_path / "999999999-0.json", "w") as f:
+        json.dump({key: totals}, f)
+
+    metrics = Metrics(path=str(tmp_path))
+    with metrics.stage("fit", rows_in=1):
+        pass
+
+    all_totals = metrics.get_totals()
+    assert all_totals[key]["runs"] == 3
+    assert all_totals[key]["rows_in"] == 11
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Merged once
+    assert metrics.get_totals()[key]["runs"] == 3
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.status import (
+    get_active_user_data,
+    get_status_counts,
+    get_status_legacy,
+)
+from utils.activity import get_dense_status
+from utils.data import DataGenerator
+from utils.model import DataModel
+
+# Users subscribing several times, so that resurrected users are compared too
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2025, 1, 1)
+TODAY = datetime(2024, 7, 1, 12)
+
+
+@pytest.fixture(scope="module")
+def model():
+    generator = DataGenerator(
+        300, START_DATE, END_DATE, seed=0, profile="seasonal", today=TODAY
+    )
+    generator.create_dataset()
+    return DataModel(generator.dataset, max_end_date=datetime(2024, 7, 2))
+
+
+@pytest.mark.parametrize("date_range", ["week", "month"])
+def test_dense_status_as_legacy(model, date_range):
+    active_user_data_date_range, is_active = get_active_user_data(model, date_range)
+    legacy = get_status_counts(
+        get_status_legacy(active_user_data_date_range.copy()), date_range
+    )
+
+    vectorized = active_user_data_date_range.copy()
+    _, _, vectorized["status"] = get_dense_status(is_active)
+    pd.testing.assert_frame_equal(legacy, get_status_counts(vectorized, date_range))
+    assert legacy["resurrected"].sum() > 0
+
+
+@pytest.mark.parametrize("date_range", ["week", "month"])
+def test_growth_accounting_as_legacy(model, date_range):
+    active_user_data_date_range, _ = get_active_user_data(model, date_range)
+    legacy = get_status_counts(
+        get_status_legacy(active_user_data_date_range.copy()), date_range
+    ).reindex(model.get_periods(date_range), fill_value=0)
+
+    active_users = model.active_users(date_range)
+    for status in ["new_active", "resurrected"]:
+        np.testing.assert_array_equal(
+            active_users[status].values, legacy[status].values
+        )
+    np.testing.assert_array_equal(-active_users["churn"].values, legacy["churn"].values)
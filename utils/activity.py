@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+
+STATUS = ["new_active", "resurrected", "churn"]
+
+
+def get_period_runs(user_codes, start_dates, end_dates, periods):
+    # Periods covered by each subscription (start <= period < end)
+    run_start = np.searchsorted(periods, start_dates, side="left")
+    run_end = np.searchsorted(periods, end_dates, side="left")
+    mask = run_start < run_end
+    user_codes = np.asarray(user_codes)[mask]
+    run_start = run_start[mask]
+    run_end = run_end[mask]
+
+    # Sort by user then start period
+    order = np.lexsort((run_start, user_codes))
+    user_codes = user_codes[order].astype(np.int64)
+    run_start = run_start[order].astype(np.int64)
+    run_end = run_end[order].astype(np.int64)
+
+    # Running max of end period within each user (users are offset so that
+    # a global running max never crosses user boundaries)
+    offset = len(periods) + 1
+    end_offset = np.maximum.accumulate(user_codes * offset + run_end)
+    previous_end = np.empty_like(end_offset)
+    previous_end[1:] = end_offset[:-1]
+    previous_end[:1] = -1
+
+    # A new run starts on a new user or after a gap of at least one period
+    is_new_user = np.ones(len(user_codes), dtype=bool)
+    is_new_user[1:] = user_codes[1:] != user_codes[:-1]
+    is_new_run = is_new_user | (user_codes * offset + run_start > previous_end)
+
+    # Merge overlapping and adjacent subscriptions of a user into runs
+    index_new_run = np.flatnonzero(is_new_run)
+    if len(index_new_run) > 0:
+        runs_end = np.maximum.reduceat(run_end, index_new_run)
+    else:
+        runs_end = run_end
+
+    return pd.DataFrame(
+        {
+            "user": user_codes[index_new_run].astype(np.int32),
+            "start": run_start[index_new_run].astype(np.int32),
+            "end": runs_end.astype(np.int32),
+            "is_first": is_new_user[index_new_run],
+        }
+    )
+
+
+def get_runs_aggregated(runs, periods, date_range):
+    runs_start = runs["start"].values
+    runs_end = runs["end"].values
+    runs_is_first = runs["is_first"].values
+    nb_periods = len(periods)
+
+    # Active users from a difference array over run boundaries
+    number_active_users = np.cumsum(
+        np.bincount(runs_start, minlength=nb_periods + 1)
+        - np.bincount(runs_end, minlength=nb_periods + 1)
+    )[:nb_periods]
+
+    # Growth accounting: first run of a user is new, later ones resurrected,
+    # and a run ending within the date range is a churn
+    new_active = np.bincount(runs_start[runs_is_first], minlength=nb_periods)
+    resurrected = np.bincount(runs_start[~runs_is_first], minlength=nb_periods)
+    churn = -np.bincount(runs_end, minlength=nb_periods + 1)[:nb_periods]
+
+    return pd.DataFrame(
+        {
+            "number_active_users": number_active_users.astype(np.int64),
+            "new_active": new_active.astype(np.int64),
+            "resurrected": resurrected.astype(np.int64),
+            "churn": churn.astype(np.int64),
+        },
+        index=pd.DatetimeIndex(periods, name=date_range),
+    )
+
+
+def get_runs_dense(runs, nb_users, nb_periods):
+    # Activity matrix (period x user) from a difference array along periods
+    is_active = np.zeros((nb_periods + 1, nb_users), dtype=np.int8)
+    np.add.at(is_active, (runs["start"].values, runs["user"].values), 1)
+    np.add.at(is_active, (runs["end"].values, runs["user"].values), -1)
+    return np.cumsum(is_active, axis=0, dtype=np.int8)[:nb_periods]
+
+
+def get_dense_status(is_active):
+    # Activity in previous period and before the current period
+    is_active_previous = np.zeros_like(is_active)
+    is_active_previous[1:] = is_active[:-1]
+    was_active = (np.cumsum(is_active, axis=0, dtype=np.int32) > 1).astype(np.int8)
+
+    # Status as categorical codes (-1 when no status change)
+    status = np.select(
+        [
+            (is_active == 1) & (is_active_previous == 0) & (was_active == 0),
+            (is_active == 1) & (is_active_previous == 0) & (was_active == 1),
+            (is_active == 0) & (is_active_previous == 1),
+        ],
+        [0, 1, 2],
+        default=-1,
+    ).astype(np.int8)
+    status = pd.Categorical.from_codes(status.ravel(), categories=STATUS)
+
+    return is_active_previous, was_active, status
+
+
+def get_runs_active(runs):
+    # Run-length decoding into one (user, period) row per active period
+    length = (runs["end"].values - runs["start"].values).astype(np.int64)
+    offset = np.repeat(np.cumsum(length) - length, length)
+    period = np.repeat(runs["start"].values, length) + (
+        np.arange(length.sum()) - offset
+    )
+    return pd.DataFrame(
+        {
+            "user": np.repeat(runs["user"].values, length),
+            "period": period.astype(np.int32),
+        }
+    )
+
+
+def get_runs_retention(runs, nb_periods):
+    runs_user = runs["user"].values
+    runs_start = runs["start"].values.astype(np.int64)
+    runs_end = runs["end"].values.astype(np.int64)
+    runs_is_first = runs["is_first"].values
+
+    # Cohort of each user is the period before their first active period
+    cohort_user = np.full(runs_user.max() + 1 if len(runs) else 0, -1)
+    cohort_user[runs_user[runs_is_first]] = runs_start[runs_is_first] - 1
+    cohort = cohort_user[runs_user]
+
+    # Active users by cohort and period number from a difference array
+    width = nb_periods + 1
+    retention_count = np.bincount(
+        cohort * width + runs_start - cohort, minlength=nb_periods * width
+    ) - np.bincount(cohort * width + runs_end - cohort, minlength=nb_periods * width)
+    retention_count = np.cumsum(retention_count.reshape(nb_periods, width), axis=1)[
+        :, :nb_periods
+    ]
+
+    # Cohort size at period number zero
+    retention_total = np.bincount(cohort[runs_is_first], minlength=nb_periods)
+    retention_count[:, 0] = retention_total
+
+    return retention_count, retention_total
+
+
+def get_retention_aggregated(retention_count, retention_total, periods, date_range):
+    nb_periods = len(periods)
+
+    # Missing outside of cohorts and date range
+    is_in_range = (
+        np.add.outer(np.arange(nb_periods), np.arange(nb_periods)) < nb_periods
+    )
+    retention_count = retention_count.astype(float)
+    retention_count[(retention_total[:, None] == 0) | ~is_in_range] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        retention_percentage = np.round(
+            100 * retention_count / retention_total[:, None]
+        )
+
+    # Numbers since first cohort, last cohort first
+    retention_columns = range(nb_periods - np.flatnonzero(retention_total).min())
+    retention_index = pd.DatetimeIndex(periods[::-1], name=f"start_{date_range}")
+    return [
+        pd.DataFrame(
+            retention_count[::-1, retention_columns],
+            index=retention_index,
+            columns=list(retention_columns),
+        ),
+        pd.DataFrame(
+            retention_percentage[::-1, retention_columns],
+            index=retention_index,
+            columns=list(retention_columns),
+        ),
+    ]
+
+
+def get_intervals(user_codes, start_dates, end_dates):
+    # Subscriptions of each user merged into disjoint intervals of activity
+    # (start <= date < end), as runs over the grid of all start and end dates
+    boundaries = np.unique(np.concatenate([start_dates, end_dates]))
+    runs = get_period_runs(user_codes, start_dates, end_dates, boundaries)
+
+    # Sorted by end date, so that intervals ending after a date are a slice
+    order = np.argsort(runs["end"].values, kind="stable")
+    return pd.DataFrame(
+        {
+            "user": runs["user"].values[order],
+            "start": boundaries[runs["start"].values[order]],
+            "end": boundaries[runs["end"].values[order]],
+        }
+    )
+
+
+def get_active_count(interval_starts, interval_ends, dates):
+    # Active users at each date from sorted start and end dates of intervals,
+    # intervals of a user being disjoint
+    return np.searchsorted(interval_starts, dates, side="right") - np.searchsorted(
+        interval_ends, dates, side="right"
+    )
+
+
+def get_sample_aggregated(intervals, dates):
+    # Growth accounting at sample dates, each compared to the previous sample:
+    # only intervals ending after the first sample are active on one of them
+    first = np.searchsorted(intervals["end"].values, dates[0], side="right")
+    intervals = intervals.iloc[first:]
+    runs = get_period_runs(
+        intervals["user"].values,
+        intervals["start"].values,
+        intervals["end"].values,
+        dates,
+    )
+    return get_runs_aggregated(runs, dates, "date")
+
+
+def get_gaps(intervals):
+    # Gaps between consecutive intervals of a user (end of an interval, start
+    # of the next one)
+    order = np.lexsort((intervals["start"].values, intervals["user"].values))
+    user = intervals["user"].values[order]
+    start = intervals["start"].values[order]
+    end = intervals["end"].values[order]
+    is_gap = user[1:] == user[:-1]
+    return end[:-1][is_gap], start[1:][is_gap]
+
+
+def get_dominance_levels(keys, values):
+    # Values ordered by key, then sorted within aligned blocks of each power of
+    # two size, to count values among the first keys by blocks of a binary
+    # decomposition
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    values = values[order]
+
+    levels = [values]
+    size = 1
+    while size < len(values):
+        size *= 2
+        nb_values = len(values) // size * size
+        level = values.copy()
+        level[:nb_values] = np.sort(
+            values[:nb_values].reshape(-1, size), axis=1
+        ).ravel()
+        levels.append(level)
+    return keys, levels
+
+
+def count_dominance(keys, levels, key, value):
+    # Count of key <= key and value > value, in O(log^2 n)
+    nb_keys = np.searchsorted(keys, key, side="right")
+    count = 0
+    start = 0
+    for level in reversed(range(len(levels))):
+        size = 1 << level
+        if nb_keys - start >= size:
+            block = levels[level][start : start + size]
+            count += size - np.searchsorted(block, value, side="right")
+            start += size
+    return int(count)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import OrderedDict
+from datetime import timedelta
+
+from utils.store import MODEL_VERSION, save_model, save_aggregates, load_model
+
+CONTENT_BLOCK_SIZE = 1024**2
+MODEL_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def get_content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_file_hash(filename):
+    # Same hash as the file content, read by blocks
+    content_hash = hashlib.sha256()
+    with open(filename, "rb") as f:
+        while True:
+            block = f.read(CONTENT_BLOCK_SIZE)
+            if not block:
+                break
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def get_as_of(model):
+    # Day the model date ranges were computed up to
+    return (model.max_end_date - timedelta(days=1)).date()
+
+
+class ModelCache:
+    def __init__(self, path, max_size, max_models=4):
+        self.path = path
+        self.max_size = max_size
+
+        # Most recently used models kept in memory, by key
+        self.max_models = max_models
+        self.models = OrderedDict()
+
+    def get_key(self, content_hash, as_of):
+        return hashlib.sha256(
+            f"{content_hash}-{as_of.isoformat()}-{MODEL_VERSION}".encode("utf-8")
+        ).hexdigest()
+
+    def read_entry(self, key):
+        filename = os.path.join(self.path, key, "cache.json")
+        with open(filename, "r") as f:
+            entry = json.load(f)
+        entry["key"] = key
+        entry["last_used"] = os.path.getmtime(filename)
+        return entry
+
+    def list_entries(self):
+        # Cached models of all versions (older versions included, so that
+        # they are evicted too), most recently used first
+        entries = []
+        if os.path.isdir(self.path):
+            for key in os.listdir(self.path):
+                if os.path.isfile(os.path.join(self.path, key, "cache.json")):
+                    entries.append(self.read_entry(key))
+        return sorted(entries, key=lambda x: x["last_used"], reverse=True)
+
+    def keep(self, key, model):
+        self.models[key] = model
+        self.models.move_to_end(key)
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+
+    def load(self, key):
+        # Loading a model marks it as recently used, None when the model was
+        # removed (e.g. evicted by another process) or is of another version
+        if not self.exists(key):
+            self.models.pop(key, None)
+            return None
+        path = os.path.join(self.path, key)
+        try:
+            if self.read_entry(key)["version"] != MODEL_VERSION:
+                self.models.pop(key, None)
+                return None
+            model = self.models.get(key)
+            if model is None:
+                model = load_model(path)
+            os.utime(os.path.join(path, "cache.json"))
+        except FileNotFoundError:
+            self.models.pop(key, None)
+            return None
+        self.keep(key, model)
+        return model
+
+    def exists(self, key):
+        # Keys come from the browser, only valid keys are looked up on disk
+        return (
+            isinstance(key, str)
+            and MODEL_KEY_PATTERN.match(key) is not None
+            and os.path.isfile(os.path.join(self.path, key, "cache.json"))
+        )
+
+    def get(self, content_hash, as_of):
+        return self.load(self.get_key(content_hash, as_of))
+
+    def get_latest(self, content_hash=None):
+        # Most recently used model, for a given input content if any
+        for entry in self.list_entries():
+            if entry["version"] != MODEL_VERSION:
+                continue
+            if content_hash is None or entry["content_hash"] == content_hash:
+                model = self.load(entry["key"])
+                if model is not None:
+                    return model, entry["content_hash"]
+        return None, None
+
+    def put(self, model, content_hash):
+        as_of = get_as_of(model)
+        key = self.get_key(content_hash, as_of)
+        path = os.path.join(self.path, key)
+
+        # Save in a temporary folder first, so that other processes only
+        # see complete models
+        if not os.path.isdir(path):
+            path_tmp = os.path.join(self.path, f".{key}-{os.getpid()}")
+            save_model(model, path_tmp)
+            with open(os.path.join(path_tmp, "cache.json"), "w") as f:
+                json.dump(
+                    {
+                        "content_hash": content_hash,
+                        "as_of": as_of.isoformat(),
+                        "version": MODEL_VERSION,
+                    },
+                    f,
+                )
+            try:
+                os.rename(path_tmp, path)
+            except OSError:
+                shutil.rmtree(path_tmp, ignore_errors=True)
+        os.utime(os.path.join(path, "cache.json"))
+        self.keep(key, model)
+
+        self.evict(keep=key)
+        return key
+
+    def save(self, key):
+        # Aggregates computed since the model was cached (e.g. when first
+        # displayed), saved with it for other processes and later loads
+        model = self.models.get(key)
+        if model is None or not self.exists(key):
+            return
+        try:
+            save_aggregates(model, os.path.join(self.path, key))
+        except FileNotFoundError:
+            # Evicted meanwhile by another process
+            self.models.pop(key, None)
+
+    def evict(self, keep=None):
+        # Remove least recently used models above the maximum size
+        entries = self.list_entries()
+        for entry in entries:
+            entry["size"] = sum(
+                entry_file.stat().st_size
+                for entry_file in os.scandir(os.path.join(self.path, entry["key"]))
+            )
+        size = sum(entry["size"] for entry in entries)
+        for entry in reversed(entries):
+            if size <= self.max_size:
+                break
+            if entry["key"] != keep:
+                shutil.rmtree(os.path.join(self.path, entry["key"]), ignore_errors=True)
+                self.models.pop(entry["key"], None)
+                size -= entry["size"]
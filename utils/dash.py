@@ -1,3 +1,5 @@
+import re
+
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 
@@ -55,22 +57,27 @@ def get_header_buttons():
     return dbc.Col(
         html.Div(
             [
+                html.P(
+                    id="output-job-progress",
+                    style={"color": DashboardColors.white, "margin": "auto 0"},
+                ),
                 dcc.Loading(
                     id="loading-state-load-data",
                     type="circle",
                     color=DashboardColors.green,
-                    children=dcc.Upload(
-                        dbc.Button(
-                            "📥 Load data",
-                            id="button-load-data",
-                            color="primary",
-                            className="me-1",
-                            n_clicks=0,
-                            disabled=False,
-                        ),
-                        id="upload-file",
+                    children=dbc.Button(
+                        "📥 Load data",
+                        id="button-load-data",
+                        color="primary",
+                        className="me-1",
+                        n_clicks=0,
+                        disabled=False,
                     ),
                 ),
+                # Clicked by assets/upload.js at the end of an upload
+                html.Button(
+                    id="button-upload-done", n_clicks=0, style={"display": "none"}
+                ),
                 html.P(id="output-load-data"),
                 dbc.Modal(
                     [
@@ -126,47 +133,134 @@ def get_filters(dict_filter_choices):
     ]
 
 
-def create_conditional_style(df):
+def create_conditional_style(columns):
     PIXEL_FOR_CHAR = 10
     style = []
-    for col in df.columns:
-        name_length = len(col)
+    for col in columns:
+        name_length = len(col["name"])
         pixel = 50 + round(name_length * PIXEL_FOR_CHAR)
         pixel = str(pixel) + "px"
-        style.append({"if": {"column_id": col}, "minWidth": pixel})
+        style.append({"if": {"column_id": col["id"]}, "minWidth": pixel})
 
     return style
 
 
+TABLE_STYLE = {
+    "style_table": {"height": 600},
+    "style_header": {
+        "color": DashboardColors.white,
+        "backgroundColor": DashboardColors.black,
+        "fontWeight": "bold",
+    },
+    "style_data": {
+        "whiteSpace": "normal",
+        "height": "auto",
+    },
+    "style_cell": {
+        "textAlign": "center",
+        "font_size": "12px",
+        "whiteSpace": "normal",
+        "height": "auto",
+    },
+}
+
+# Operators of DataTable filter queries, by name and symbols
+TABLE_FILTER_OPERATORS = {
+    "ge": ["ge", ">="],
+    "le": ["le", "<="],
+    "lt": ["lt", "<"],
+    "gt": ["gt", ">"],
+    "ne": ["ne", "!="],
+    "eq": ["eq", "="],
+    "contains": ["contains"],
+    "datestartswith": ["datestartswith"],
+}
+TABLE_FILTER_PART = re.compile(
+    r"^\s*\{(?P<column>[^}]*)\}\s+(?P<operator>\S+)\s+(?P<value>.*)$"
+)
+
+
 def get_table(df, filter_action="native"):
-    style_cell_conditional = create_conditional_style(df)
+    columns = [{"name": i, "id": i} for i in df.columns]
 
     return dash_table.DataTable(
         data=df.to_dict("records"),
-        columns=[{"name": i, "id": i} for i in df.columns],
+        columns=columns,
         editable=False,
         fixed_rows={"headers": True},
         page_size=50,
         filter_action=filter_action,
         sort_action="native",
         sort_mode="multi",
-        style_table={"height": 600},
-        style_cell_conditional=style_cell_conditional,
-        style_header={
-            "color": DashboardColors.white,
-            "backgroundColor": DashboardColors.black,
-            "fontWeight": "bold",
-        },
-        style_data={
-            "whiteSpace": "normal",
-            "height": "auto",
-        },
-        style_cell={
-            "textAlign": "center",
-            "font_size": "12px",
-            "whiteSpace": "normal",
-            "height": "auto",
-        },
+        style_cell_conditional=create_conditional_style(columns),
+        **TABLE_STYLE,
+    )
+
+
+def get_query_table(table_id, columns, page_size=50):
+    # Rows of the current page only, paged, sorted and filtered on the server
+    # by a callback
+    return dash_table.DataTable(
+        id=table_id,
+        data=[],
+        columns=columns,
+        editable=False,
+        fixed_rows={"headers": True},
+        page_current=0,
+        page_size=page_size,
+        page_action="custom",
+        filter_action="custom",
+        filter_query="",
+        sort_action="custom",
+        sort_mode="multi",
+        sort_by=[],
+        style_cell_conditional=create_conditional_style(columns),
+        **TABLE_STYLE,
+    )
+
+
+def get_table_filters(filter_query):
+    # Column, operator name and value of each part of a DataTable filter query
+    # (e.g. {start_date} >= 2024-01-01 && {user_id} contains "abc")
+    filters = []
+    for filter_part in filter_query.split(" && ") if filter_query else []:
+        match = TABLE_FILTER_PART.match(filter_part)
+        operator = match and next(
+            (
+                x
+                for x in TABLE_FILTER_OPERATORS
+                if match["operator"] in TABLE_FILTER_OPERATORS[x]
+            ),
+            None,
+        )
+        if operator is None:
+            raise ValueError(f"Invalid filter: {filter_part}")
+
+        value = match["value"].strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"`":
+            value = value[1:-1].replace("\\" + value[0], value[0])
+        filters.append((match["column"], operator, value))
+    return filters
+
+
+def get_tabs(page, date_ranges):
+    # Tab content is rendered by a callback on the active tab
+    return dbc.CardHeader(
+        [
+            dbc.Tabs(
+                [
+                    dbc.Tab(label=date_range.capitalize(), tab_id=date_range)
+                    for date_range in date_ranges
+                ],
+                id=f"tabs-{page}",
+                active_tab=date_ranges[0],
+            ),
+            dcc.Loading(
+                type="circle",
+                color=DashboardColors.gray,
+                children=html.Div(id=f"tab-content-{page}"),
+            ),
+        ]
     )
 
 
@@ -1,48 +1,288 @@
-import pandas as pd
-import random
-from datetime import datetime, timedelta
-import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Users generated by chunk, each chunk with its own seed so that the dataset
+# does not depend on the number of processes
+CHUNK_USERS = 1_000_000
+
+# Columns of the generated data, as read by utils.ingestion
+SCHEMA = pa.schema(
+    [
+        ("user_id", pa.string()),
+        ("subscription_id", pa.string()),
+        ("start_date", pa.date32()),
+        ("end_date", pa.date32()),
+    ]
+)
+
+# Hexadecimal digits of each byte (two characters as one 16-bit value), and
+# positions of the hexadecimal digits in UUIDs
+HEX_BYTES = (
+    np.array([list(f"{i:02x}") for i in range(256)], dtype="S1")
+    .view(np.uint8)
+    .reshape(256, 2)
+    .copy()
+    .view(np.uint16)
+    .ravel()
+)
+UUID_GROUPS = [(0, 8), (8, 12), (12, 16), (16, 20), (20, 32)]
+
+# Workload profiles: number of subscriptions per user (geometric, from the
+# probability to resubscribe after churn), subscription durations (Weibull, a
+# shape below 1 for a churn hazard decreasing with tenure and above 1 for an
+# increasing one), gaps before resubscribing (exponential, or overlapping the
+# previous subscription, e.g. a plan change), acquisition by month of the year
+# with a yearly growth, and share of users with an open-ended last subscription.
+# The uniform profile is one subscription per user with uniform dates.
+PROFILE_DEFAULTS = {
+    "resubscription_rate": 0.0,
+    "max_subscriptions": 10,
+    "duration_scale": 365,
+    "duration_shape": 1.0,
+    "gap_scale": 30,
+    "overlap_share": 0.0,
+    "seasonality": [1.0] * 12,
+    "growth": 1.0,
+    "open_ended_share": 0.0,
+}
+PROFILES = {
+    "uniform": None,
+    "subscription": {
+        "resubscription_rate": 0.35,
+        "duration_scale": 180,
+        "duration_shape": 0.8,
+        "gap_scale": 90,
+        "overlap_share": 0.1,
+        "growth": 1.3,
+        "open_ended_share": 0.25,
+    },
+    "seasonal": {
+        "resubscription_rate": 0.5,
+        "duration_scale": 60,
+        "duration_shape": 0.6,
+        "gap_scale": 45,
+        "overlap_share": 0.05,
+        "seasonality": [2.0, 1.0, 0.8, 0.8, 0.7, 0.6, 0.6, 0.8, 1.5, 1.0, 2.5, 3.0],
+        "growth": 1.1,
+        "open_ended_share": 0.15,
+    },
+}
+
+
+def get_uuids(rng, number_ids):
+    # Random (version 4) UUIDs from random bytes, formatted in bulk into the
+    # data buffer of an Arrow string array
+    uuid_bytes = rng.integers(0, 256, size=(number_ids, 16), dtype=np.uint8)
+    uuid_bytes[:, 6] = (uuid_bytes[:, 6] & 0x0F) | 0x40
+    uuid_bytes[:, 8] = (uuid_bytes[:, 8] & 0x3F) | 0x80
+    uuid_hex = HEX_BYTES[uuid_bytes].view(np.uint8)
+
+    uuid_chars = np.full((number_ids, 36), ord("-"), dtype=np.uint8)
+    for i, (start, end) in enumerate(UUID_GROUPS):
+        uuid_chars[:, start + i : end + i] = uuid_hex[:, start:end]
+    offsets = np.arange(0, 36 * (number_ids + 1), 36, dtype=np.int32)
+    return pa.StringArray.from_buffers(
+        number_ids, pa.py_buffer(offsets), pa.py_buffer(uuid_chars)
+    )
+
+
+def get_profile(profile):
+    # Parameters of a profile, by name or as a dict of parameters
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    if profile is None:
+        return None
+    return {**PROFILE_DEFAULTS, **profile}
+
+
+def generate_subscriptions(
+    rng, number_users, min_start_date, max_end_date, today, profile
+):
+    # Subscriptions of each user one after the other, in order
+    number_subscriptions = np.minimum(
+        rng.geometric(1 - profile["resubscription_rate"], number_users),
+        profile["max_subscriptions"],
+    )
+    user_index = np.repeat(np.arange(number_users), number_subscriptions)
+    number_rows = len(user_index)
+    first = np.cumsum(number_subscriptions) - number_subscriptions
+    is_first = np.zeros(number_rows, dtype=bool)
+    is_first[first] = True
+
+    # Durations and gaps after the previous subscription of the user
+    duration = np.maximum(
+        np.ceil(
+            profile["duration_scale"]
+            * rng.weibull(profile["duration_shape"], number_rows)
+        ),
+        1,
+    ).astype(np.int64)
+    previous_duration = np.roll(duration, 1)
+    gap = np.ceil(rng.exponential(profile["gap_scale"], number_rows)).astype(np.int64)
+    overlap = ~is_first & (rng.random(number_rows) < profile["overlap_share"])
+    gap[overlap] = -rng.integers(0, previous_duration[overlap])
+    offset = np.cumsum(np.where(is_first, 0, previous_duration + gap))
+    offset -= np.repeat(offset[first], number_subscriptions)
+
+    # First start date, by acquisition weight of each day up to today
+    days = np.arange(min_start_date, min(max_end_date, today) + 1)
+    weights = np.asarray(profile["seasonality"])[
+        days.astype("datetime64[M]").astype(np.int64) % 12
+    ] * profile["growth"] ** ((days - min_start_date).astype(np.int64) / 365.25)
+    cumulative_weights = np.cumsum(weights)
+    first_start_date = days[
+        np.searchsorted(
+            cumulative_weights,
+            rng.random(number_users) * cumulative_weights[-1],
+            side="right",
+        )
+    ]
+
+    start_date = np.repeat(first_start_date, number_subscriptions) + offset
+    end_date = np.minimum(start_date + duration, max_end_date)
+    is_open = np.zeros(number_rows, dtype=bool)
+    is_open[first + number_subscriptions - 1] = (
+        rng.random(number_users) < profile["open_ended_share"]
+    )
+
+    # Subscriptions starting after today are not known yet
+    is_known = start_date <= min(max_end_date, today)
+    return (
+        user_index[is_known],
+        start_date[is_known],
+        end_date[is_known],
+        is_open[is_known],
+    )
+
+
+def generate_users(
+    seed, number_users, min_start_date, max_end_date, today, profile=None
+):
+    rng = np.random.default_rng(seed)
+    min_start_date = np.datetime64(min_start_date, "D")
+    max_end_date = np.datetime64(max_end_date, "D")
+
+    if profile is not None:
+        user_index, start_date, end_date, is_open = generate_subscriptions(
+            rng,
+            number_users,
+            min_start_date,
+            max_end_date,
+            np.datetime64(today, "D"),
+            profile,
+        )
+        today = np.datetime64(today, "us")
+        return pa.table(
+            [
+                get_uuids(rng, number_users).take(pa.array(user_index)),
+                get_uuids(rng, len(user_index)),
+                pa.array(start_date),
+                pa.array(end_date, mask=is_open | (end_date >= today)),
+            ],
+            schema=SCHEMA,
+        )
+
+    # IDs
+    user_id = get_uuids(rng, number_users)
+    subscription_id = get_uuids(rng, number_users)
+
+    # Start date, up to today
+    date_range_start = (
+        min(max_end_date, np.datetime64(today, "D")) - min_start_date
+    ).astype(int)
+    start_date = min_start_date + rng.integers(0, date_range_start + 1, number_users)
+
+    # End date
+    date_range_end = (max_end_date - start_date).astype(int)
+    end_date = start_date + rng.integers(0, date_range_end + 1)
+
+    # Dates after today are not known yet
+    today = np.datetime64(today, "us")
+    return pa.table(
+        [
+            user_id,
+            subscription_id,
+            pa.array(start_date, mask=start_date >= today),
+            pa.array(end_date, mask=end_date >= today),
+        ],
+        schema=SCHEMA,
+    )
 
 
 class DataGenerator:
-    def __init__(self, number_users, min_start_date, max_end_date):
+    def __init__(
+        self,
+        number_users,
+        min_start_date,
+        max_end_date,
+        seed=None,
+        profile="uniform",
+        today=None,
+    ):
         self.number_users = number_users
         self.min_start_date = min_start_date
         self.max_end_date = max_end_date
+        self.profile = get_profile(profile)
 
-    def create_dataset(self):
-        data = []
-        for _ in range(self.number_users):
-            # IDs
-            user_id = uuid.uuid4()
-            subscription_id = uuid.uuid4()
+        # Seed of the dataset, drawn once when not given so that the dataset
+        # created and exported are the same, and date of the data (today by
+        # default) so that benchmarks are reproducible
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.today = today or datetime.today()
 
-            # Start date
-            date_range_start = (
-                min(self.max_end_date, datetime.today()) - self.min_start_date
+    def get_tables(self, n_jobs=1):
+        # Tables of each chunk of users, in order
+        number_chunks = -(-self.number_users // CHUNK_USERS)
+        chunks = [
+            (
+                seed,
+                min(CHUNK_USERS, self.number_users - i * CHUNK_USERS),
+                self.min_start_date,
+                self.max_end_date,
+                self.today,
+                self.profile,
             )
-            random_start_days = random.randint(0, date_range_start.days)
-            start_date = self.min_start_date + timedelta(days=random_start_days)
-
-            # End date
-            date_range_end = self.max_end_date - start_date
-            random_end_days = random.randint(0, date_range_end.days)
-            end_date = start_date + timedelta(days=random_end_days)
-
-            data.append([user_id, subscription_id, start_date, end_date])
-
-        list_columns = ["user_id", "subscription_id", "start_date", "end_date"]
-        dataset = pd.DataFrame(data, columns=list_columns)
-
-        for c in ["start_date", "end_date"]:
-            dataset[c] = dataset[c].apply(
-                lambda x: None if x >= datetime.today() else x
+            for i, seed in enumerate(
+                np.random.SeedSequence(self.seed, spawn_key=(i,))
+                for i in range(number_chunks)
             )
+        ]
+        if n_jobs > 1:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                yield from executor.map(generate_users, *zip(*chunks))
+        else:
+            for chunk in chunks:
+                yield generate_users(*chunk)
+
+    def create_dataset(self, n_jobs=1):
+        self.dataset = (
+            pa.concat_tables(self.get_tables(n_jobs))
+            .to_pandas(date_as_object=False)
+            .astype({"start_date": "datetime64[ns]", "end_date": "datetime64[ns]"})
+        )
 
-        self.dataset = dataset
+    def export_csv(self, filename, n_jobs=1):
+        # Written by chunk, without the dataset in memory
+        with pa_csv.CSVWriter(
+            filename,
+            SCHEMA,
+            write_options=pa_csv.WriteOptions(quoting_style="none"),
+        ) as writer:
+            for table in self.get_tables(n_jobs):
+                writer.write_table(table)
 
-    def export_csv(self, filename):
-        self.dataset.to_csv(filename, index=False)
+    def export_parquet(self, filename, n_jobs=1):
+        with pq.ParquetWriter(filename, SCHEMA) as writer:
+            for table in self.get_tables(n_jobs):
+                writer.write_table(table)
 
 
 if __name__ == "__main__":
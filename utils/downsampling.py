@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def get_lttb_indices(x, y, nb_points):
+    # Largest triangle three buckets: first and last points, and in each bucket
+    # between them the point forming the largest triangle with the previous
+    # selected point and the mean of the next bucket
+    nb_values = len(y)
+    if nb_values <= nb_points:
+        return np.arange(nb_values)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    bounds = np.linspace(1, nb_values - 1, nb_points - 1).astype(np.int64)
+    indices = np.empty(nb_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = nb_values - 1
+
+    previous = 0
+    for i in range(nb_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else nb_values
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + np.argmax(area)
+        indices[i + 1] = previous
+    return indices
+
+
+def get_min_max_indices(y_max, y_min, nb_buckets):
+    # In each bucket, the points of the largest value of a series and of the
+    # smallest value of another one (e.g. positive and negative stacked bars),
+    # so that all series keep the same points
+    nb_values = len(y_max)
+    if nb_values <= 2 * nb_buckets:
+        return np.arange(nb_values)
+
+    bucket = np.arange(nb_values) * nb_buckets // nb_values
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    index_max = np.lexsort((-np.asarray(y_max), bucket))[starts]
+    index_min = np.lexsort((np.asarray(y_min), bucket))[starts]
+    return np.union1d(index_max, index_min)
@@ -0,0 +1,27 @@
+class FigureRegistry:
+    def __init__(self, model_cache):
+        # Figures are created by the cached models on first access and kept
+        # with them, None when the model is not cached (anymore)
+        self.model_cache = model_cache
+
+    def get_charts(self, model_key, date_range, names):
+        model = self.model_cache.load(model_key)
+        if model is None:
+            return None
+        charts = {name: model.chart(name, date_range) for name in names}
+        self.model_cache.save(model_key)
+        return charts
+
+    def get_zoomed_chart(self, model_key, name, date_range, x_range):
+        # Figure within dates, at full resolution when there are few enough
+        # periods, not kept
+        model = self.model_cache.load(model_key)
+        if model is None:
+            return None
+        return getattr(model, f"get_chart_{name}")(date_range, x_range)
+
+    def get_kpis(self, model_key):
+        model = self.model_cache.load(model_key)
+        if model is None:
+            return None
+        return model.kpis()
@@ -0,0 +1,13 @@
+import os
+import time
+
+
+def remove_old_files(path, max_age):
+    # Files not modified for more than the maximum age (in seconds), files
+    # removed meanwhile by another process skipped
+    for entry in os.scandir(path):
+        try:
+            if entry.stat().st_mtime < time.time() - max_age:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
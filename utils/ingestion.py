@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from utils.metrics import metrics
+
+# Columns of the input data, IDs are dictionary encoded and dates parsed with
+# an explicit format
+SCHEMA = {
+    "user_id": "category",
+    "subscription_id": "category",
+    "start_date": "date",
+    "end_date": "date",
+}
+REQUIRED_COLUMNS = ["user_id", "subscription_id", "start_date"]
+DATE_FORMAT = "%Y-%m-%d"
+
+CHUNK_SIZE = 1_000_000
+BLOCK_SIZE = 64 * 1024**2
+MAX_ERRORS_MESSAGE = 5
+
+
+def get_date_columns():
+    return [c for c in SCHEMA if SCHEMA[c] == "date"]
+
+
+def read_chunks_pandas(filename, chunksize):
+    # Read as text, IDs encoded in order of appearance (without sorting them
+    # as the category dtype of read_csv does) and dates parsed with the
+    # explicit format
+    with pd.read_csv(
+        filename, usecols=list(SCHEMA), dtype=str, chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            for c in SCHEMA:
+                if SCHEMA[c] == "category":
+                    chunk[c] = pd.Categorical.from_codes(*pd.factorize(chunk[c]))
+
+            is_invalid = {}
+            for c in get_date_columns():
+                dates = pd.to_datetime(chunk[c], format=DATE_FORMAT, errors="coerce")
+                is_invalid[c] = (chunk[c].notna() & dates.isna()).values
+                chunk[c] = dates
+            yield chunk, is_invalid
+
+
+def read_chunks_pyarrow(filename):
+    # Multi-threaded parsing by blocks of the file, dates parsed with the
+    # explicit format as nulls when invalid
+    column_types = {
+        c: (
+            pa.dictionary(pa.int32(), pa.string())
+            if SCHEMA[c] == "category"
+            else pa.string()
+        )
+        for c in SCHEMA
+    }
+    reader = pa_csv.open_csv(
+        filename,
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(SCHEMA),
+            column_types=column_types,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        is_invalid = {}
+        columns = {}
+        for c in SCHEMA:
+            column = batch.column(c)
+            if SCHEMA[c] == "date":
+                dates = pc.strptime(
+                    column, format=DATE_FORMAT, unit="ns", error_is_null=True
+                )
+                is_invalid[c] = pc.and_(
+                    pc.is_valid(column), pc.is_null(dates)
+                ).to_numpy(zero_copy_only=False)
+                column = dates
+            columns[c] = column
+        yield pa.table(columns).to_pandas(), is_invalid
+
+
+def get_errors(chunk, is_invalid, row_offset):
+    # One error per invalid value, with the line in the file (after header)
+    errors = []
+    for c in REQUIRED_COLUMNS:
+        is_missing = chunk[c].isna().values
+        if c in is_invalid:
+            is_missing &= ~is_invalid[c]
+        errors.append((np.flatnonzero(is_missing), c, "missing value"))
+    for c in is_invalid:
+        errors.append((np.flatnonzero(is_invalid[c]), c, f"not a {DATE_FORMAT} date"))
+    errors.append(
+        (
+            np.flatnonzero((chunk["end_date"] < chunk["start_date"]).values),
+            "end_date",
+            "before start_date",
+        )
+    )
+    return pd.DataFrame(
+        {
+            "line": np.concatenate([x[0] for x in errors]) + row_offset + 2,
+            "column": np.concatenate([[x[1]] * len(x[0]) for x in errors]),
+            "error": np.concatenate([[x[2]] * len(x[0]) for x in errors]),
+        }
+    )
+
+
+def get_category_codes(values, categories):
+    # Codes of categorical values in categories of all chunks so far, with
+    # new categories appended in order
+    mapping = categories.get_indexer(values.categories)
+    is_new = mapping < 0
+    mapping[is_new] = np.arange(len(categories), len(categories) + is_new.sum())
+    categories = categories.append(values.categories[is_new])
+    codes = np.where(values.codes >= 0, mapping[values.codes], -1).astype(np.int32)
+    return codes, categories
+
+
+@metrics.instrument("read_subscriptions", rows_out=lambda result: len(result[0]))
+def read_subscriptions(filename, engine="c", chunksize=CHUNK_SIZE, progress=None):
+    progress = progress or (lambda stage: None)
+
+    # Columns of the schema in the file
+    columns = pd.read_csv(filename, nrows=0).columns
+    missing_columns = [c for c in SCHEMA if c not in columns]
+    if missing_columns:
+        raise Exception(f"Missing columns: {', '.join(missing_columns)}")
+
+    # Parsed and typed by chunks, so that raw text values of one chunk only
+    # are in memory at a time
+    if engine == "pyarrow":
+        reader = read_chunks_pyarrow(filename)
+    else:
+        reader = read_chunks_pandas(filename, chunksize)
+
+    # Only the values of each chunk are kept, IDs as codes in the categories
+    # of all chunks
+    values = {c: [] for c in SCHEMA}
+    categories = {c: pd.Index([], dtype=object) for c in SCHEMA}
+    errors = []
+    nb_rows = 0
+    for chunk, is_invalid in reader:
+        errors.append(get_errors(chunk, is_invalid, nb_rows))
+        for c in SCHEMA:
+            if SCHEMA[c] == "category":
+                codes, categories[c] = get_category_codes(
+                    chunk[c].values, categories[c]
+                )
+                values[c].append(codes)
+            else:
+                values[c].append(chunk[c].values)
+        nb_rows += len(chunk)
+        del chunk
+        progress(f"reading data ({nb_rows:,} rows)")
+    if nb_rows == 0:
+        raise Exception("No subscriptions")
+
+    # Columns concatenated one at a time, with values of chunks released as
+    # they are, and not copied again into the dataset
+    columns = {}
+    for c in SCHEMA:
+        column = np.concatenate(values.pop(c))
+        if SCHEMA[c] == "category":
+            column = pd.Categorical.from_codes(column, categories.pop(c))
+        columns[c] = column
+    dataset = pd.DataFrame(columns, copy=False)
+    errors = pd.concat(errors, ignore_index=True).sort_values("line", kind="stable")
+
+    return dataset, errors.reset_index(drop=True)
+
+
+def get_errors_message(errors):
+    message = ", ".join(
+        f"line {x['line']}: {x['column']} {x['error']}"
+        for _, x in errors.head(MAX_ERRORS_MESSAGE).iterrows()
+    )
+    if len(errors) > MAX_ERRORS_MESSAGE:
+        message += ", ..."
+    return f"{len(errors)} invalid values ({message})"
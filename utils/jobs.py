@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.files import remove_old_files
+
+
+def get_job_status(path, job_id):
+    filename = os.path.join(path, f"{job_id}.json")
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def set_job_status(path, job_id, state, stage, result=None):
+    # Written to a temporary file first, so that polling never reads a
+    # partial status
+    filename = os.path.join(path, f"{job_id}.json")
+    with open(f"{filename}.tmp", "w") as f:
+        json.dump({"state": state, "stage": stage, "result": result}, f)
+    os.replace(f"{filename}.tmp", filename)
+
+
+def run_job(path, job_id, function, args):
+    def progress(stage):
+        print(f"> Job {job_id[:8]}: {stage}")
+        set_job_status(path, job_id, "running", stage)
+
+    try:
+        result = function(*args, progress=progress)
+        set_job_status(path, job_id, "done", "done", result)
+    except Exception as e:
+        print(f"> Job {job_id[:8]} failed: {e}")
+        set_job_status(path, job_id, "failed", str(e))
+
+
+class JobRunner:
+    def __init__(self, path, max_workers=2, max_age=24 * 3600):
+        self.path = path
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.executor = None
+
+    def get_executor(self):
+        # Worker processes are spawned on first use, so that they do not
+        # inherit the threads of the web server
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
+    def submit(self, function, *args):
+        # Job status is kept on disk, so that any app process can poll it
+        os.makedirs(self.path, exist_ok=True)
+        self.clean()
+        job_id = uuid.uuid4().hex
+        set_job_status(self.path, job_id, "queued", "queued")
+        future = self.get_executor().submit(run_job, self.path, job_id, function, args)
+        future.add_done_callback(lambda x: self.check_job(job_id, x))
+        return job_id
+
+    def check_job(self, job_id, future):
+        # A worker process that died (e.g. out of memory) breaks the pool, shut
+        # down before a new one is started on next submit
+        if future.exception() is not None:
+            set_job_status(self.path, job_id, "failed", str(future.exception()))
+            executor, self.executor = self.executor, None
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_status(self, job_id):
+        return get_job_status(self.path, job_id)
+
+    def clean(self):
+        # Remove status of old jobs
+        remove_old_files(self.path, self.max_age)
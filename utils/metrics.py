@@ -0,0 +1,240 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Totals of each stage, summed over runs (peak RSS is the largest of runs)
+STAGE_TOTALS = ["runs", "errors", "wall_time", "cpu_time", "rows_in", "rows_out"]
+PROMETHEUS_METRICS = [
+    ("runs", "model_stage_runs_total", "counter", "Runs of the stage"),
+    ("errors", "model_stage_errors_total", "counter", "Failed runs of the stage"),
+    ("wall_time", "model_stage_wall_seconds_total", "counter", "Wall time"),
+    ("cpu_time", "model_stage_cpu_seconds_total", "counter", "CPU time"),
+    ("rows_in", "model_stage_rows_in_total", "counter", "Rows read"),
+    ("rows_out", "model_stage_rows_out_total", "counter", "Rows produced"),
+    ("peak_rss", "model_stage_peak_rss_bytes", "gauge", "Peak RSS of the process"),
+]
+
+
+def get_prometheus_labels(labels):
+    # Label values with backslashes, quotes and new lines escaped
+    values = []
+    for key, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        values.append(f'{key}="{value}"')
+    return "{" + ",".join(values) + "}"
+
+
+def add_totals(all_totals, key, totals):
+    if key not in all_totals:
+        all_totals[key] = dict(totals)
+    else:
+        for total in STAGE_TOTALS:
+            all_totals[key][total] += totals[total]
+        all_totals[key]["peak_rss"] = max(
+            all_totals[key]["peak_rss"], totals["peak_rss"]
+        )
+
+
+def is_running(filename):
+    # Process of a totals file, named by process ID and start time
+    pid, create_time = os.path.basename(filename)[: -len(".json")].split("-")
+    try:
+        return int(psutil.Process(int(pid)).create_time()) == int(create_time)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+class Metrics:
+    def __init__(self, path=None, sample_interval=0.01):
+        # Totals of stages run in this process, by stage and labels, also
+        # written to disk (when a path is set) so that the app reports stages
+        # run by job processes too
+        self.path = path
+        self.totals = {}
+        self.handlers = [self.log]
+
+        # Peak RSS of open stages, sampled in a thread while stages are open
+        self.sample_interval = sample_interval
+        self.process = psutil.Process()
+        self.open_stages = []
+        self.sampler = None
+        self.lock = threading.Lock()
+
+    def configure(self, path):
+        # Stages logged and totals written by each process of the app
+        self.path = path
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+
+    def add_handler(self, handler):
+        # Called with the record of each stage run, e.g. to export it elsewhere
+        self.handlers.append(handler)
+
+    def log(self, record):
+        logger.info(json.dumps(record))
+
+    def sample_rss(self):
+        while True:
+            with self.lock:
+                if not self.open_stages:
+                    self.sampler = None
+                    return
+                rss = self.process.memory_info().rss
+                for record in self.open_stages:
+                    record["peak_rss"] = max(record["peak_rss"], rss)
+            time.sleep(self.sample_interval)
+
+    @contextmanager
+    def stage(self, name, rows_in=None, **labels):
+        # Wall time, CPU time and peak RSS of the stage, rows out set by the
+        # stage on the record, e.g. stage["rows_out"] = len(df)
+        record = {
+            "stage": name,
+            **labels,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "peak_rss": self.process.memory_info().rss,
+        }
+        with self.lock:
+            self.open_stages.append(record)
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self.sample_rss, daemon=True)
+                self.sampler.start()
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        error = None
+        try:
+            yield record
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record["wall_time"] = time.perf_counter() - start_wall_time
+            record["cpu_time"] = time.process_time() - start_cpu_time
+            with self.lock:
+                self.open_stages.remove(record)
+                record["peak_rss"] = max(
+                    record["peak_rss"], self.process.memory_info().rss
+                )
+            record["error"] = error
+            self.record(record, labels)
+
+    def instrument(self, name, rows_in=None, rows_out=None):
+        # Decorator of a function run as a stage, rows in and out from
+        # functions of its arguments and result
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(
+                    name, rows_in=rows_in(*args, **kwargs) if rows_in else None
+                ) as stage:
+                    result = function(*args, **kwargs)
+                    if rows_out:
+                        stage["rows_out"] = rows_out(result)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def record(self, record, labels):
+        key = json.dumps({"stage": record["stage"], **labels}, sort_keys=True)
+        with self.lock:
+            totals = self.totals.setdefault(
+                key, {**{total: 0 for total in STAGE_TOTALS}, "peak_rss": 0}
+            )
+            totals["runs"] += 1
+            totals["errors"] += record["error"] is not None
+            totals["wall_time"] += record["wall_time"]
+            totals["cpu_time"] += record["cpu_time"]
+            totals["rows_in"] += record["rows_in"] or 0
+            totals["rows_out"] += record["rows_out"] or 0
+            totals["peak_rss"] = max(totals["peak_rss"], record["peak_rss"])
+
+            # Written once stages within others are done
+            if self.path is not None and not self.open_stages:
+                self.write_totals()
+
+        for handler in self.handlers:
+            handler(record)
+
+    def write_totals(self):
+        # Written to a temporary file first, so that reading never gets
+        # partial totals, by process (and start time, as process IDs are
+        # reused)
+        os.makedirs(self.path, exist_ok=True)
+        filename = os.path.join(
+            self.path, f"{self.process.pid}-{int(self.process.create_time())}.json"
+        )
+        with open(f"{filename}.tmp", "w") as f:
+            json.dump(self.totals, f)
+        os.replace(f"{filename}.tmp", filename)
+
+    def merge_ended(self):
+        # Totals of processes that ended (app restarts, job processes) merged
+        # into the totals of this process, so that their files do not pile up.
+        # A file is claimed by renaming it, so that it is merged once
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".json") or is_running(entry.path):
+                continue
+            claimed = f"{entry.path}.{self.process.pid}.merged"
+            try:
+                os.rename(entry.path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed, "r") as f:
+                process_totals = json.load(f)
+            with self.lock:
+                for key, totals in process_totals.items():
+                    add_totals(self.totals, key, totals)
+                self.write_totals()
+            os.remove(claimed)
+
+    def get_totals(self):
+        # Totals of all processes (of processes that ended included)
+        if self.path is None or not os.path.isdir(self.path):
+            with self.lock:
+                return {key: dict(totals) for key, totals in self.totals.items()}
+
+        self.merge_ended()
+        all_totals = {}
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, "r") as f:
+                    process_totals = json.load(f)
+            except FileNotFoundError:
+                # Merged meanwhile by another process
+                continue
+            for key, totals in process_totals.items():
+                add_totals(all_totals, key, totals)
+        return all_totals
+
+    def get_prometheus_text(self):
+        # Totals in the Prometheus text exposition format
+        totals = sorted(self.get_totals().items())
+        lines = []
+        for total, metric, metric_type, description in PROMETHEUS_METRICS:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for key, stage_totals in totals:
+                labels = get_prometheus_labels(json.loads(key))
+                lines.append(f"{metric}{labels} {stage_totals[total]}")
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the stages of the model and the app
+metrics = Metrics()
@@ -1,26 +1,118 @@
+import operator
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import plotly.graph_objects as go
 
+from utils.activity import (
+    get_intervals,
+    get_active_count,
+    get_sample_aggregated,
+    get_gaps,
+    get_dominance_levels,
+    count_dominance,
+    get_period_runs,
+    get_runs_aggregated,
+    get_runs_dense,
+    get_runs_active,
+    get_runs_retention,
+    get_retention_aggregated,
+    get_dense_status,
+)
 from utils.dash import DashboardColors
+from utils.ingestion import DATE_FORMAT
+from utils.downsampling import get_lttb_indices, get_min_max_indices
+from utils.metrics import metrics
+from utils.parallel import fit_parallel
+
+# Charts of each date range, by name of their DataModel.get_chart_<name> method
+CHART_NAMES = {
+    "day": ["active_users", "growth_accounting"],
+    "week": [
+        "active_users",
+        "growth_accounting",
+        "churn_count",
+        "churn_percentage",
+        "retention",
+    ],
+    "month": [
+        "active_users",
+        "growth_accounting",
+        "churn_count",
+        "churn_percentage",
+        "retention",
+    ],
+}
+
+# Code column and IDs attribute of each ID column of the input data
+INPUT_ID_COLUMNS = {
+    "user_id": ["user", "users"],
+    "subscription_id": ["subscription", "subscriptions"],
+}
+
+# Comparisons of the input data filters
+INPUT_FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
+
+# Maximum number of points of a trace, above which it is downsampled
+CHART_MAX_POINTS = 500
+
+
+def get_id_codes(ids, index=None):
+    # Dense int32 codes of IDs, with IDs not in the index appended in order of
+    # appearance
+    if index is None or len(index) == 0:
+        codes, new_ids = pd.factorize(ids)
+        return codes.astype(np.int32), pd.Index(np.asarray(new_ids))
+    codes = index.get_indexer(ids)
+    is_new = codes < 0
+    new_codes, new_ids = pd.factorize(ids[is_new])
+    codes[is_new] = new_codes + len(index)
+    return codes.astype(np.int32), index.append(pd.Index(np.asarray(new_ids)))
 
 
 class DataModel:
-    def __init__(self, dataset):
-        # Dataset
+    @metrics.instrument(
+        "model_init", rows_in=lambda self, dataset, *args, **kwargs: len(dataset)
+    )
+    def __init__(self, dataset, max_end_date=None, users=None, subscriptions=None):
+        # Dataset, with IDs encoded once as codes (unless already encoded) and
+        # original IDs only kept by code
+        if users is None or subscriptions is None:
+            user_codes, users = get_id_codes(dataset["user_id"])
+            subscription_codes, subscriptions = get_id_codes(dataset["subscription_id"])
+            dataset = pd.DataFrame(
+                {
+                    "user": user_codes,
+                    "subscription": subscription_codes,
+                    "start_date": dataset["start_date"].values,
+                    "end_date": dataset["end_date"].values,
+                }
+            )
         self.dataset = dataset
+        self.users = users
+        self.subscriptions = subscriptions
 
         # List IDs and unique count
-        self.list_users = pd.unique(dataset["user_id"])
-        self.list_subscriptions = pd.unique(dataset.index)
+        self.list_users = self.users
+        self.list_subscriptions = self.subscriptions
         self.nb_users = len(self.list_users)
         self.nb_subscriptions = len(self.list_subscriptions)
 
         # Start and end dates
         self.min_start_date = dataset["start_date"].min() - timedelta(days=1)
-        self.max_end_date = datetime.today() + relativedelta(days=1)
+        if max_end_date is None:
+            self.max_end_date = datetime.today() + relativedelta(days=1)
+        else:
+            self.max_end_date = max_end_date
 
         # Date range - days
         self.list_date_range_day = [
@@ -68,315 +160,563 @@ class DataModel:
             "month": self.list_date_range_month,
         }
 
-    def fit(self):
-        active_user_data = self.dataset.copy()
-        active_user_data["end_date"] = active_user_data["end_date"].fillna(
+        # Aggregates and charts, computed on first access
+        self.activity_runs_dict = {}
+        self.active_user_data_aggregated_dict = {}
+
+        self.retention_count_dict = {}
+        self.retention_data_aggregated_dict = {}
+
+        self.charts_dict = {}
+        self.kpis_dict = None
+
+        # Intervals of activity of each user, for KPIs at any date
+        self.activity_intervals = None
+        self.activity_interval_starts = None
+        self.activity_gaps = None
+
+        # Ranks of IDs and codes of dates, to sort and filter the input data
+        self.id_ranks = {}
+        self.date_codes = {}
+
+    def get_periods(self, date_range):
+        return pd.DatetimeIndex(self.date_range_dict[date_range]).values
+
+    def get_subscription_data(self):
+        # Subscriptions without end date are active up to the last date range
+        subscription_data = self.dataset.copy()
+        subscription_data["end_date"] = subscription_data["end_date"].fillna(
             self.max_end_date
         )
+        return subscription_data
 
-        self.active_user_data_dict = {}
+    @metrics.instrument("fit", rows_in=lambda self, *args, **kwargs: len(self.dataset))
+    def fit(self, progress=None, n_jobs=1, date_ranges=None):
+        # Aggregates of the date ranges (all by default) computed now rather
+        # than on first access
+        progress = progress or (lambda stage: None)
+        if date_ranges is None:
+            date_ranges = list(self.date_range_dict)
+
+        self.activity_runs_dict = {}
         self.active_user_data_aggregated_dict = {}
 
-        self.retention_data_dict = {}
+        self.retention_count_dict = {}
         self.retention_data_aggregated_dict = {}
 
-        for date_range in self.date_range_dict:
-            # Cross join date range and subscriptions
-            data_date_range = pd.DataFrame(
-                self.date_range_dict[date_range], columns=[date_range]
-            )
-            active_user_data_date_range = pd.merge(
-                data_date_range, active_user_data, how="cross"
-            )
-            active_user_data_date_range = active_user_data_date_range.sort_values(
-                ["user_id", date_range]
+        self.charts_dict = {}
+        self.kpis_dict = None
+
+        # Date ranges and partitions of users fitted in parallel processes
+        if n_jobs > 1:
+            active_user_data = self.get_subscription_data()
+            fitted = fit_parallel(
+                active_user_data["user"].values,
+                active_user_data["start_date"].values,
+                active_user_data["end_date"].values,
+                {
+                    date_range: self.date_range_dict[date_range]
+                    for date_range in date_ranges
+                },
+                n_jobs,
+                progress,
             )
-
-            # Active subscription in each date range
-            active_user_data_date_range["is_active"] = (
-                active_user_data_date_range.apply(
-                    lambda x: (
-                        1 if x["start_date"] <= x[date_range] < x["end_date"] else 0
-                    ),
-                    axis=1,
+            for date_range in fitted:
+                runs, active_user_data_date_range_aggregated, retention_count = fitted[
+                    date_range
+                ]
+                self.activity_runs_dict[date_range] = runs
+                self.active_user_data_aggregated_dict[date_range] = (
+                    active_user_data_date_range_aggregated
                 )
-            )
-            active_user_data_date_range = (
-                active_user_data_date_range.groupby([date_range, "user_id"])[
-                    "is_active"
+                self.retention_count_dict[date_range] = [
+                    retention_count,
+                    retention_count[:, 0],
                 ]
-                .max()
-                .reset_index()
-            )
 
-            # Status over time ()
-            active_user_data_date_range["is_active_previous"] = (
-                active_user_data_date_range.groupby("user_id")["is_active"].shift(
-                    1, fill_value=0
+        for date_range in date_ranges:
+            progress(f"fitting {date_range}")
+            self.active_users(date_range)
+
+            progress(f"building retention {date_range}")
+            self.retention(date_range)
+
+    def runs(self, date_range):
+        # Activity runs of each user over the date range
+        if date_range not in self.activity_runs_dict:
+            with metrics.stage(
+                "runs", rows_in=len(self.dataset), date_range=date_range
+            ) as stage:
+                active_user_data = self.get_subscription_data()
+                self.activity_runs_dict[date_range] = get_period_runs(
+                    active_user_data["user"].values,
+                    active_user_data["start_date"].values,
+                    active_user_data["end_date"].values,
+                    self.get_periods(date_range),
                 )
-            )
-            active_user_data_date_range["was_active"] = (
-                active_user_data_date_range.groupby("user_id")["is_active"].cumsum()
-            )
-            active_user_data_date_range["was_active"] = active_user_data_date_range[
-                "was_active"
-            ].apply(lambda x: 1 if x > 1 else 0)
-            active_user_data_date_range["status"] = active_user_data_date_range.apply(
-                lambda x: (
-                    "new_active"
-                    if x["is_active"] == 1
-                    and x["is_active_previous"] == 0
-                    and x["was_active"] == 0
-                    else (
-                        "resurrected"
-                        if x["is_active"] == 1
-                        and x["is_active_previous"] == 0
-                        and x["was_active"] == 1
-                        else (
-                            "churn"
-                            if x["is_active"] == 0 and x["is_active_previous"] == 1
-                            else None
-                        )
+                stage["rows_out"] = len(self.activity_runs_dict[date_range])
+        return self.activity_runs_dict[date_range]
+
+    def active_users(self, date_range):
+        # Active users and growth accounting - aggregated
+        if date_range not in self.active_user_data_aggregated_dict:
+            runs = self.runs(date_range)
+            with metrics.stage(
+                "active_users", rows_in=len(runs), date_range=date_range
+            ) as stage:
+                self.active_user_data_aggregated_dict[date_range] = get_runs_aggregated(
+                    runs, self.get_periods(date_range), date_range
+                )
+                stage["rows_out"] = len(
+                    self.active_user_data_aggregated_dict[date_range]
+                )
+        return self.active_user_data_aggregated_dict[date_range]
+
+    def retention_count(self, date_range):
+        # Retention - active users by cohort and period number
+        if date_range not in self.retention_count_dict:
+            runs = self.runs(date_range)
+            with metrics.stage(
+                "retention_count", rows_in=len(runs), date_range=date_range
+            ) as stage:
+                self.retention_count_dict[date_range] = list(
+                    get_runs_retention(runs, len(self.date_range_dict[date_range]))
+                )
+                stage["rows_out"] = len(self.retention_count_dict[date_range][0])
+        return self.retention_count_dict[date_range]
+
+    def retention(self, date_range):
+        # Retention - count and percentage by cohort and period number
+        if date_range not in self.retention_data_aggregated_dict:
+            retention_count, retention_total = self.retention_count(date_range)
+            with metrics.stage(
+                "retention", rows_in=len(retention_count), date_range=date_range
+            ) as stage:
+                self.retention_data_aggregated_dict[date_range] = (
+                    get_retention_aggregated(
+                        retention_count,
+                        retention_total,
+                        self.get_periods(date_range),
+                        date_range,
                     )
-                ),
-                axis=1,
+                )
+                stage["rows_out"] = len(self.retention_data_aggregated_dict[date_range])
+        return self.retention_data_aggregated_dict[date_range]
+
+    def intervals(self):
+        # Intervals of activity of each user, sorted by end date
+        if self.activity_intervals is None:
+            with metrics.stage("intervals", rows_in=len(self.dataset)) as stage:
+                subscription_data = self.get_subscription_data()
+                self.activity_intervals = get_intervals(
+                    subscription_data["user"].values,
+                    subscription_data["start_date"].values,
+                    subscription_data["end_date"].values,
+                )
+                self.activity_interval_starts = np.sort(
+                    self.activity_intervals["start"].values
+                )
+                stage["rows_out"] = len(self.activity_intervals)
+        return self.activity_intervals
+
+    def active_count(self, at=None, between=None):
+        # Active users at a date, or at any date between two dates (included),
+        # subscriptions without end date being active up to the last date range
+        intervals = self.intervals()
+        if at is not None and between is None:
+            return int(
+                get_active_count(
+                    self.activity_interval_starts,
+                    intervals["end"].values,
+                    pd.Timestamp(at).to_datetime64(),
+                )
             )
-
-            # Active users - aggregated
-            aggregated_active = pd.DataFrame(
-                active_user_data_date_range.groupby(by=date_range)["is_active"].sum()
+        elif between is not None and at is None:
+            start, end = [pd.Timestamp(x).to_datetime64() for x in between]
+            if end < start:
+                raise ValueError("End date before start date")
+
+            # Intervals active between the dates, less gaps of a user between
+            # the dates (counted once for both intervals around them)
+            nb_intervals = np.searchsorted(
+                self.activity_interval_starts, end, side="right"
+            ) - np.searchsorted(intervals["end"].values, start, side="right")
+            if self.activity_gaps is None:
+                gap_starts, gap_ends = get_gaps(intervals)
+                self.activity_gaps = get_dominance_levels(gap_ends, gap_starts)
+            nb_gaps = count_dominance(*self.activity_gaps, end, start)
+            return int(nb_intervals - nb_gaps)
+        else:
+            raise ValueError("Either a date or two dates are expected")
+
+    def chart(self, name, date_range):
+        # Figures created once, by get_chart_<name>
+        if (name, date_range) not in self.charts_dict:
+            with metrics.stage("chart", chart=name, date_range=date_range):
+                self.charts_dict[(name, date_range)] = getattr(
+                    self, f"get_chart_{name}"
+                )(date_range)
+        return self.charts_dict[(name, date_range)]
+
+    def kpis(self):
+        if self.kpis_dict is None:
+            self.kpis_dict = self.get_kpis()
+        return self.kpis_dict
+
+    @metrics.instrument(
+        "update",
+        rows_in=lambda self, delta=None, *args, **kwargs: (
+            0 if delta is None else len(delta)
+        ),
+    )
+    def update(self, delta=None, progress=None):
+        # Without delta, date ranges are only advanced up to today
+        progress = progress or (lambda stage: None)
+
+        # Previous state
+        previous_dataset = self.dataset
+        previous_date_range_dict = self.date_range_dict
+        previous_min_start_date = self.min_start_date
+        previous_runs_dict = self.activity_runs_dict
+        previous_aggregated_dict = self.active_user_data_aggregated_dict
+        previous_retention_count_dict = self.retention_count_dict
+
+        # Codes of the delta, new IDs after previous ones
+        if delta is None:
+            delta = self.dataset.iloc[:0]
+            users = self.users
+            subscriptions = self.subscriptions
+        else:
+            user_codes, users = get_id_codes(delta["user_id"], self.users)
+            subscription_codes, subscriptions = get_id_codes(
+                delta["subscription_id"], self.subscriptions
             )
-            aggregated_active.columns = ["number_active_users"]
-
-            # New users - aggregated
-            active_user_data_date_range["new_active"] = active_user_data_date_range[
-                "status"
-            ].apply(lambda x: 1 if x == "new_active" else 0)
-            aggregated_new_active = pd.DataFrame(
-                active_user_data_date_range.groupby(by=date_range)["new_active"].sum()
+            delta = pd.DataFrame(
+                {
+                    "user": user_codes,
+                    "subscription": subscription_codes,
+                    "start_date": delta["start_date"].values,
+                    "end_date": delta["end_date"].values,
+                }
             )
-            aggregated_new_active.columns = ["new_active"]
 
-            # Resurected users - aggregated
-            active_user_data_date_range["resurrected"] = active_user_data_date_range[
-                "status"
-            ].apply(lambda x: 1 if x == "resurrected" else 0)
-            aggregated_resurrected = pd.DataFrame(
-                active_user_data_date_range.groupby(by=date_range)["resurrected"].sum()
-            )
-            aggregated_resurrected.columns = ["resurrected"]
+        # Dataset with new subscriptions, and updated ones replaced (other rows
+        # kept as they are, as a fit would)
+        dataset = pd.concat(
+            [
+                self.dataset.loc[
+                    ~self.dataset["subscription"].isin(delta["subscription"])
+                ],
+                delta,
+            ]
+        ).reset_index(drop=True)
 
-            # Churn - aggregated
-            active_user_data_date_range["churn"] = active_user_data_date_range[
-                "status"
-            ].apply(lambda x: -1 if x == "churn" else 0)
-            aggregated_churn = pd.DataFrame(
-                active_user_data_date_range.groupby(by=date_range)["churn"].sum()
-            )
-            aggregated_churn.columns = ["churn"]
+        # Date ranges up to today, with new dicts of aggregates so that a copy
+        # of the model before update is unchanged
+        self.__init__(dataset, users=users, subscriptions=subscriptions)
 
-            # All aggregated
-            active_user_data_date_range_aggregated = pd.concat(
-                [
-                    aggregated_active,
-                    aggregated_new_active,
-                    aggregated_resurrected,
-                    aggregated_churn,
-                ],
-                axis=1,
-            )
+        # History before the previous first period needs a full fit
+        if self.min_start_date != previous_min_start_date:
+            self.fit(progress, date_ranges=list(previous_runs_dict))
+            return
 
-            # Retention - start date
-            retention_data = active_user_data_date_range.loc[
-                :,
-                ["user_id", date_range, "is_active"],
-            ]
-            retention_start_date = (
-                retention_data.loc[retention_data["is_active"] == 1]
-                .groupby(by="user_id")[date_range]
-                .min()
-                .reset_index()
-            )
-            retention_start_date.columns = ["user_id", f"start_{date_range}"]
-            retention_start_date[f"start_{date_range}"] = retention_start_date[
-                f"start_{date_range}"
-            ].apply(
-                lambda x: (
-                    x - timedelta(days=1)
-                    if date_range == "day"
-                    else (
-                        x - timedelta(days=7)
-                        if date_range == "week"
-                        else (x - timedelta(days=1)).replace(day=1)
-                    )
-                )
-            )
-            retention_data_start_period = retention_start_date.copy()
-            retention_data_start_period["is_active"] = 1
-            retention_data_start_period.columns = retention_data.columns
-            retention_data = pd.concat(
-                [retention_data, retention_data_start_period], axis=0
-            )
+        active_user_data = self.get_subscription_data()
 
-            retention_data = pd.merge(
-                retention_data, retention_start_date, how="left", on="user_id"
-            )
+        # Previous users of updated subscriptions
+        previous_delta_users = previous_dataset.loc[
+            previous_dataset["subscription"].isin(delta["subscription"]), "user"
+        ]
 
-            # Retention - add total
-            retention_start_date_total = (
-                retention_start_date.groupby(by=f"start_{date_range}")["user_id"]
-                .nunique()
-                .reset_index()
-            )
-            retention_start_date_total.columns = [f"start_{date_range}", "total"]
-            retention_data = pd.merge(
-                retention_data,
-                retention_start_date_total,
-                on=f"start_{date_range}",
-                how="left",
-            )
-            retention_data["percentage"] = retention_data.apply(
-                lambda x: (
-                    100 * x["is_active"] / x["total"] if x["total"] != 0 else None
-                ),
-                axis=1,
+        user_codes = active_user_data["user"].values
+        delta_user_codes = np.concatenate(
+            [delta["user"].values, previous_delta_users.values]
+        )
+
+        # Date ranges not computed yet are computed on first access
+        for date_range in previous_runs_dict:
+            periods = self.get_periods(date_range)
+            previous_periods = pd.DatetimeIndex(
+                previous_date_range_dict[date_range]
+            ).values
+            progress(f"updating {date_range}")
+
+            runs = previous_runs_dict[date_range]
+
+            # Affected users: updated subscriptions or subscriptions ending after
+            # the previous last period
+            is_affected = np.zeros(len(self.users), dtype=bool)
+            is_affected[delta_user_codes] = True
+            is_affected[
+                user_codes[active_user_data["end_date"].values > previous_periods[-1]]
+            ] = True
+            is_affected_runs = is_affected[runs["user"].values]
+            is_affected_subscriptions = is_affected[user_codes]
+
+            # Activity runs of affected users, before and after update
+            previous_runs = runs.loc[is_affected_runs]
+            updated_runs = get_period_runs(
+                user_codes[is_affected_subscriptions],
+                active_user_data["start_date"].values[is_affected_subscriptions],
+                active_user_data["end_date"].values[is_affected_subscriptions],
+                periods,
             )
+            runs = pd.concat([runs.loc[~is_affected_runs], updated_runs])
+            self.activity_runs_dict[date_range] = runs.reset_index(drop=True)
+
+            # Active users and growth accounting - aggregated
+            if date_range in previous_aggregated_dict:
+                active_user_data_date_range_aggregated = (
+                    previous_aggregated_dict[date_range].reindex(periods, fill_value=0)
+                    - get_runs_aggregated(
+                        previous_runs, previous_periods, date_range
+                    ).reindex(periods, fill_value=0)
+                    + get_runs_aggregated(updated_runs, periods, date_range)
+                )
+                active_user_data_date_range_aggregated.index.name = date_range
+                self.active_user_data_aggregated_dict[date_range] = (
+                    active_user_data_date_range_aggregated
+                )
 
-            if date_range == "month":
-                retention_data[f"{date_range}_number"] = retention_data.apply(
-                    lambda x: (
-                        relativedelta(x[date_range], x[f"start_{date_range}"]).years
-                        * 12
-                        + relativedelta(x[date_range], x[f"start_{date_range}"]).months
-                        if x[f"start_{date_range}"] <= x[date_range]
-                        else None
-                    ),
-                    axis=1,
+            # Retention - active users by cohort and period number
+            if date_range in previous_retention_count_dict:
+                progress(f"building retention {date_range}")
+                padding = len(periods) - len(previous_periods)
+                retention_count, retention_total = previous_retention_count_dict[
+                    date_range
+                ]
+                previous_count, previous_total = get_runs_retention(
+                    previous_runs, len(previous_periods)
                 )
-            elif date_range == "week":
-                retention_data[f"{date_range}_number"] = retention_data.apply(
-                    lambda x: (
-                        int((x[date_range] - x[f"start_{date_range}"]).days / 7)
-                        if x[f"start_{date_range}"] <= x[date_range]
-                        else None
-                    ),
-                    axis=1,
+                updated_count, updated_total = get_runs_retention(
+                    updated_runs, len(periods)
                 )
-            elif date_range == "day":
-                retention_data[f"{date_range}_number"] = retention_data.apply(
-                    lambda x: (
-                        (x[date_range] - x[f"start_{date_range}"]).days
-                        if x[f"start_{date_range}"] <= x[date_range]
-                        else None
-                    ),
-                    axis=1,
+                retention_count = (
+                    np.pad(retention_count - previous_count, (0, padding))
+                    + updated_count
                 )
+                retention_total = (
+                    np.pad(retention_total - previous_total, (0, padding))
+                    + updated_total
+                )
+                self.retention_count_dict[date_range] = [
+                    retention_count,
+                    retention_total,
+                ]
 
-            retention_data = retention_data[retention_data[f"{date_range}_number"] >= 0]
-
-            # Retention - pivot - numbers
-            retention_data_pivot_number = retention_data.pivot_table(
-                index=f"start_{date_range}",
-                columns=f"{date_range}_number",
-                values=["is_active"],
-                aggfunc="sum",
-                dropna=False,
-            ).reset_index()
-
-            retention_data_pivot_number_complete = pd.DataFrame(
-                [
-                    [d] + [None for _ in retention_data_pivot_number.values[0][1:]]
-                    for d in self.date_range_dict[date_range]
-                    if d not in pd.unique(retention_data[f"start_{date_range}"])
-                ],
-                columns=retention_data_pivot_number.columns,
-            )
-
-            retention_data_pivot_number = pd.concat(
-                [retention_data_pivot_number, retention_data_pivot_number_complete],
-                axis=0,
-            ).reset_index(drop=True)
-
-            retention_data_pivot_number.columns = (
-                retention_data_pivot_number.columns.droplevel(0)
+    def get_delta(self, dataset):
+        # Subscriptions in the dataset that are new or have changed, compared
+        # on codes of the previous IDs (-1 for new IDs), None for a full fit
+        # when subscription IDs are repeated (rows are not matched one to one)
+        if (
+            self.dataset["subscription"].duplicated().any()
+            or dataset["subscription_id"].duplicated().any()
+        ):
+            return None
+        subscription_codes = self.subscriptions.get_indexer(dataset["subscription_id"])
+        is_kept = np.zeros(len(self.subscriptions), dtype=bool)
+        is_kept[subscription_codes[subscription_codes >= 0]] = True
+        if not is_kept[self.dataset["subscription"].values].all():
+            return None
+        user_codes = self.users.get_indexer(dataset["user_id"])
+
+        previous = self.dataset.set_index("subscription").reindex(subscription_codes)
+        start_dates = dataset["start_date"].values
+        end_dates = dataset["end_date"].values
+        is_changed = (
+            (subscription_codes < 0)
+            | (user_codes != previous["user"].values)
+            | (start_dates != previous["start_date"].values)
+            | ~(
+                (end_dates == previous["end_date"].values)
+                | (pd.isna(end_dates) & previous["end_date"].isna().values)
             )
-            retention_data_pivot_number.columns = [
-                x if i != 0 else f"start_{date_range}"
-                for i, x in enumerate(retention_data_pivot_number.columns)
-            ]
-            retention_data_pivot_number = retention_data_pivot_number.set_index(
-                f"start_{date_range}"
-            ).sort_index(ascending=False)
-            retention_data_pivot_number.columns = [
-                i for i, _ in enumerate(retention_data_pivot_number.columns)
-            ]
+        )
+        return dataset.loc[is_changed]
+
+    def get_input_data(self, index=None):
+        # Dataset with original IDs, for display (rows of an index if any)
+        dataset = self.dataset if index is None else self.dataset.iloc[index]
+        return pd.DataFrame(
+            {
+                "user_id": self.users[dataset["user"].values],
+                "subscription_id": self.subscriptions[dataset["subscription"].values],
+                "start_date": dataset["start_date"].values,
+                "end_date": dataset["end_date"].values,
+            }
+        )
 
-            # Retention - pivot - retention
-            retention_data_pivot_percentage = (
-                (
-                    retention_data.pivot_table(
-                        index=f"start_{date_range}",
-                        columns=f"{date_range}_number",
-                        values=["percentage"],
-                        aggfunc="sum",
-                        dropna=False,
-                    )
+    def get_input_filter(self, column, operator_name, value):
+        # Rows of the dataset matching a filter, IDs filtered once by code
+        if column in INPUT_ID_COLUMNS:
+            ids = getattr(self, INPUT_ID_COLUMNS[column][1]).astype(str)
+            if operator_name == "contains":
+                is_id = ids.str.contains(value, regex=False)
+            elif operator_name in INPUT_FILTER_OPERATORS:
+                is_id = INPUT_FILTER_OPERATORS[operator_name](ids, value)
+            else:
+                raise ValueError(f"Invalid filter on {column}: {operator_name}")
+            return np.asarray(is_id)[self.dataset[INPUT_ID_COLUMNS[column][0]].values]
+        elif column in ("start_date", "end_date"):
+            dates = self.dataset[column].values
+            if operator_name in ("contains", "datestartswith"):
+                # Text of each distinct date, missing dates as empty text
+                if column not in self.date_codes:
+                    self.date_codes[column] = np.unique(dates, return_inverse=True)
+                unique_dates, date_codes = self.date_codes[column]
+                text = pd.Series(
+                    pd.DatetimeIndex(unique_dates).strftime(DATE_FORMAT)
+                ).fillna("")
+                if operator_name == "contains":
+                    is_date = text.str.contains(value, regex=False)
+                else:
+                    is_date = text.str.startswith(value)
+                return is_date.values[date_codes]
+            elif operator_name in INPUT_FILTER_OPERATORS:
+                return INPUT_FILTER_OPERATORS[operator_name](
+                    dates, pd.Timestamp(value).to_datetime64()
                 )
-                .round()
-                .reset_index()
-            )
+            else:
+                raise ValueError(f"Invalid filter on {column}: {operator_name}")
+        else:
+            raise ValueError(f"Invalid column: {column}")
+
+    def get_input_sort_key(self, column):
+        # Integer keys of the dataset rows in the order of a column (IDs by rank
+        # of their code), and missing values
+        if column in INPUT_ID_COLUMNS:
+            if column not in self.id_ranks:
+                ids = getattr(self, INPUT_ID_COLUMNS[column][1])
+                ranks = np.empty(len(ids), dtype=np.int64)
+                ranks[np.argsort(ids.astype(str).values, kind="stable")] = np.arange(
+                    len(ids)
+                )
+                self.id_ranks[column] = ranks
+            codes = self.dataset[INPUT_ID_COLUMNS[column][0]].values
+            return self.id_ranks[column][codes], np.zeros(len(codes), dtype=bool)
+        elif column in ("start_date", "end_date"):
+            dates = self.dataset[column].values
+            is_missing = np.isnat(dates)
+            return np.where(is_missing, 0, dates.view(np.int64)), is_missing
+        else:
+            raise ValueError(f"Invalid column: {column}")
+
+    def get_input_data_page(self, filters=(), sort_by=(), page=0, page_size=50):
+        # Rows of a page of the input data, filtered and sorted on codes and
+        # dates, with only the rows of the page decoded, and number of rows
+        is_kept = np.ones(len(self.dataset), dtype=bool)
+        for column, operator_name, value in filters:
+            is_kept &= self.get_input_filter(column, operator_name, value)
+        index = np.flatnonzero(is_kept)
+
+        # Missing values last, in both directions
+        if sort_by:
+            keys = []
+            for x in reversed(sort_by):
+                key, is_missing = self.get_input_sort_key(x["column_id"])
+                keys.append(key[index] * (-1 if x["direction"] == "desc" else 1))
+                keys.append(is_missing[index])
+            index = index[np.lexsort(keys)]
+
+        page_index = index[page * page_size : (page + 1) * page_size]
+        return self.get_input_data(page_index), len(index)
+
+    def get_active_user_data(self, date_range):
+        runs = self.runs(date_range)
+        periods = pd.DatetimeIndex(self.date_range_dict[date_range]).values
+
+        # Active subscription in each date range
+        is_active = get_runs_dense(runs, len(self.users), len(periods))
+
+        # Status over time
+        is_active_previous, was_active, status = get_dense_status(is_active)
+
+        return pd.DataFrame(
+            {
+                date_range: np.repeat(periods, len(self.users)),
+                "user_id": np.tile(self.users, len(periods)),
+                "is_active": is_active.ravel().astype(np.int64),
+                "is_active_previous": is_active_previous.ravel(),
+                "was_active": was_active.ravel(),
+                "status": status,
+            }
+        )
 
-            retention_data_pivot_percentage_complete = pd.DataFrame(
-                [
-                    [d] + [None for _ in retention_data_pivot_percentage.values[0][1:]]
-                    for d in self.date_range_dict[date_range]
-                    if d not in pd.unique(retention_data[f"start_{date_range}"])
-                ],
-                columns=retention_data_pivot_percentage.columns,
-            )
+    def get_retention_data(self, date_range):
+        runs = self.runs(date_range)
+        periods = pd.DatetimeIndex(self.date_range_dict[date_range]).values
 
-            retention_data_pivot_percentage = pd.concat(
-                [
-                    retention_data_pivot_percentage,
-                    retention_data_pivot_percentage_complete,
-                ],
-                axis=0,
-            ).reset_index(drop=True)
+        # Retention - start period (period before the first active one)
+        retention_start = runs.loc[runs["is_first"], ["user", "start"]]
+        retention_start_period = np.full(len(self.users), -1, dtype=np.int32)
+        retention_start_period[retention_start["user"].values] = (
+            retention_start["start"].values - 1
+        )
 
-            retention_data_pivot_percentage.columns = (
-                retention_data_pivot_percentage.columns.droplevel(0)
-            )
-            retention_data_pivot_percentage.columns = [
-                x if i != 0 else f"start_{date_range}"
-                for i, x in enumerate(retention_data_pivot_percentage.columns)
-            ]
-            retention_data_pivot_percentage = retention_data_pivot_percentage.set_index(
-                f"start_{date_range}"
-            ).sort_index(ascending=False)
-            retention_data_pivot_percentage.columns = [
-                i for i, _ in enumerate(retention_data_pivot_percentage.columns)
+        # Retention - active periods and start period of each user
+        retention_active = get_runs_active(runs)
+        retention_user = np.concatenate(
+            [retention_active["user"].values, retention_start["user"].values]
+        )
+        retention_period = np.concatenate(
+            [
+                retention_active["period"].values,
+                retention_start["start"].values - 1,
             ]
+        )
+        retention_start_user = retention_start_period[retention_user]
 
-            # Store in dict
-            self.active_user_data_dict[date_range] = active_user_data_date_range
-            self.active_user_data_aggregated_dict[date_range] = (
-                active_user_data_date_range_aggregated
-            )
-            self.retention_data_dict[date_range] = retention_data
-            self.retention_data_aggregated_dict[date_range] = [
-                retention_data_pivot_number,
-                retention_data_pivot_percentage,
-            ]
+        # Retention - add total
+        retention_total = np.bincount(
+            retention_start["start"].values - 1, minlength=len(periods)
+        )
+
+        retention_data = pd.DataFrame(
+            {
+                "user_id": self.users[retention_user],
+                date_range: periods[retention_period],
+                "is_active": 1,
+                f"start_{date_range}": periods[retention_start_user],
+                "total": retention_total[retention_start_user],
+            }
+        )
+        retention_data["percentage"] = 100 / retention_data["total"]
+        retention_data[f"{date_range}_number"] = retention_period - retention_start_user
+
+        return retention_data
+
+    def get_retention_curves(self, date_range):
+        periods = pd.DatetimeIndex(self.date_range_dict[date_range])
+
+        # Cohorts with users
+        retention_count = self.retention(date_range)[0]
+        retention_count = retention_count.loc[retention_count[0] > 0].sort_index()
+        cohort = periods.get_indexer(retention_count.index)
+
+        # Active users by cohort and date range (zero up to the cohort start)
+        number = np.arange(len(periods))[None, :] - cohort[:, None]
+        number_active_users = np.where(
+            number > 0,
+            np.take_along_axis(
+                np.nan_to_num(retention_count.values),
+                np.clip(number, 0, retention_count.shape[1] - 1),
+                axis=1,
+            ),
+            0,
+        )
 
+        return pd.DataFrame(
+            {
+                f"start_{date_range}": np.repeat(retention_count.index, len(periods)),
+                date_range: np.tile(periods, len(cohort)),
+                "number_active_users": number_active_users.ravel().astype(np.int64),
+            }
+        )
+
+    @metrics.instrument("kpis", rows_in=lambda self: len(self.dataset))
     def get_kpis(self):
         # Dict charts
         dict_kpis = {}
 
-        # Data
-        active_users_day = self.active_user_data_aggregated_dict["day"]
-        active_users_week = self.active_user_data_aggregated_dict["week"]
-        active_users_month = self.active_user_data_aggregated_dict["month"]
-
         # KPIs
         today = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
         this_week = today - timedelta(days=(today.weekday()) % 7)
@@ -384,11 +724,38 @@ class DataModel:
         this_month = today.replace(day=1)
         last_month = this_month - relativedelta(month=1)
 
-        active_users_now = active_users_day["number_active_users"][today]
-        active_users_end_last_week = active_users_day["number_active_users"][this_week]
-        active_users_end_last_month = active_users_day["number_active_users"][
-            this_month
-        ]
+        # Active users at dates, and growth accounting of weeks and months
+        # compared to their previous one, from intervals of activity rather
+        # than aggregates of each date range
+        intervals = self.intervals()
+        active_users = get_active_count(
+            self.activity_interval_starts,
+            intervals["end"].values,
+            pd.DatetimeIndex([today, this_week, this_month]).values,
+        )
+        active_users_week = get_sample_aggregated(
+            intervals,
+            pd.DatetimeIndex(
+                sorted({last_week - timedelta(days=7), last_week, this_week})
+            ).values,
+        )
+        active_users_month = get_sample_aggregated(
+            intervals,
+            pd.DatetimeIndex(
+                sorted(
+                    {
+                        last_month - relativedelta(months=1),
+                        last_month,
+                        this_month - relativedelta(months=1),
+                        this_month,
+                    }
+                )
+            ).values,
+        )
+
+        active_users_now = active_users[0]
+        active_users_end_last_week = active_users[1]
+        active_users_end_last_month = active_users[2]
 
         dict_kpis["active_users_now"] = go.Figure(
             go.Indicator(
@@ -530,13 +897,32 @@ class DataModel:
         # Dict charts
         dict_chart = {}
 
-        # Data
-        active_users = self.active_user_data_aggregated_dict[date_range]
-        retention_aggregated_count = self.retention_data_aggregated_dict[date_range][0]
-        retention_aggregated_percentage = self.retention_data_aggregated_dict[
-            date_range
-        ][1]
-        retention_data = self.retention_data_dict[date_range]
+        for name in CHART_NAMES[date_range]:
+            dict_chart[name] = self.chart(name, date_range)
+
+        return dict_chart
+
+    def get_active_users_range(self, date_range, x_range=None):
+        # Active users within dates if any, with the periods around them so
+        # that lines reach the edges of the range
+        active_users = self.active_users(date_range)
+        if x_range is not None:
+            start, end = np.searchsorted(
+                active_users.index.values, pd.DatetimeIndex(x_range).values
+            )
+            active_users = active_users.iloc[max(start - 1, 0) : end + 1]
+        return active_users
+
+    def get_chart_active_users(self, date_range, x_range=None):
+        # Data, downsampled keeping the shape of the line
+        active_users = self.get_active_users_range(date_range, x_range)
+        active_users = active_users.iloc[
+            get_lttb_indices(
+                active_users.index.values.astype(np.int64),
+                active_users["number_active_users"].values,
+                CHART_MAX_POINTS,
+            )
+        ]
 
         # Active users
         fig = go.Figure()
@@ -556,7 +942,20 @@ class DataModel:
             xaxis_title=date_range.capitalize(),
             yaxis_title="Number of active users",
         )
-        dict_chart["active_users"] = fig
+        if x_range is not None:
+            fig.update_layout(xaxis_range=x_range)
+        return fig
+
+    def get_chart_growth_accounting(self, date_range, x_range=None):
+        # Data, downsampled keeping the highest and lowest bars
+        active_users = self.get_active_users_range(date_range, x_range)
+        active_users = active_users.iloc[
+            get_min_max_indices(
+                active_users["new_active"].values + active_users["resurrected"].values,
+                active_users["churn"].values,
+                CHART_MAX_POINTS // 2,
+            )
+        ]
 
         # Growth accounting
         fig = go.Figure()
@@ -593,190 +992,163 @@ class DataModel:
             yaxis_title="Number of users",
             barmode="relative",
         )
-        dict_chart["growth_accounting"] = fig
-
-        if date_range in ("week", "month"):
-
-            # Churn
-            churn_data = active_users.loc[:, ["churn", "number_active_users"]]
-            churn_data["number_active_users_previous"] = churn_data[
-                "number_active_users"
-            ].shift(periods=1)
-            churn_data["churn"] = -churn_data["churn"]
-            churn_data["churn_percentage"] = churn_data.apply(
-                lambda x: (
-                    round(100 * x["churn"] / x["number_active_users_previous"], 1)
-                    if x["number_active_users_previous"] != 0
-                    and x["number_active_users_previous"] != None
-                    else None
-                ),
-                axis=1,
-            )
+        if x_range is not None:
+            fig.update_layout(xaxis_range=x_range)
+        return fig
+
+    def get_churn_data(self, date_range):
+        # Churn count and percentage of the active users of the previous period
+        active_users = self.active_users(date_range)
+
+        churn_data = active_users.loc[:, ["churn", "number_active_users"]]
+        churn_data["number_active_users_previous"] = churn_data[
+            "number_active_users"
+        ].shift(periods=1)
+        churn_data["churn"] = -churn_data["churn"]
+        churn_data["churn_percentage"] = churn_data.apply(
+            lambda x: (
+                round(100 * x["churn"] / x["number_active_users_previous"], 1)
+                if x["number_active_users_previous"] != 0
+                and x["number_active_users_previous"] != None
+                else None
+            ),
+            axis=1,
+        )
 
-            fig_churn_count = go.Figure()
-            fig_churn_count.add_trace(
-                go.Bar(
-                    x=churn_data.index,
-                    y=churn_data["churn"],
-                    name="Churn",
-                    hovertemplate="<b>%{x}</b>: %{y} users<extra></extra>",
-                    marker_color=DashboardColors.red,
-                )
-            )
-            fig_churn_count.update_layout(
-                title="Churn users",
-                xaxis_title=date_range.capitalize(),
-                yaxis_title="Number of churn users",
-            )
-            dict_chart["churn_count"] = fig_churn_count
+        return churn_data
 
-            fig_churn_percentage = go.Figure()
-            fig_churn_percentage.add_trace(
-                go.Scatter(
-                    x=churn_data.index,
-                    y=churn_data["churn_percentage"],
-                    hovertemplate="<b>%{x}</b>: %{y}% churn<extra></extra>",
-                    marker_color=DashboardColors.red,
-                    marker_symbol="square",
-                    mode="markers+lines",
-                )
-            )
-            fig_churn_percentage.update_layout(
-                title="Churn users",
-                xaxis_title=date_range.capitalize(),
-                yaxis_title="Percentage of churn users",
-            )
-            dict_chart["churn_percentage"] = fig_churn_percentage
+    def get_chart_churn_count(self, date_range):
+        # Data
+        churn_data = self.get_churn_data(date_range)
 
-            # Retention
-            fig_count = go.Figure()
-            fig_count.add_trace(
-                go.Heatmap(
-                    x=retention_aggregated_count.columns,
-                    y=[
-                        x.strftime("%Y-%m-%d") for x in retention_aggregated_count.index
-                    ],
-                    z=retention_aggregated_count.values,
-                    hovertemplate="<b>Start: %{y}<br>"
-                    + f"{date_range.capitalize()}: "
-                    + "%{x}</b><br>%{z} users<extra></extra>",
-                    text=retention_aggregated_count.values,
-                    texttemplate="%{z}",
-                    colorscale="Greens",
-                    hoverongaps=False,
-                    xgap=1,
-                    ygap=1,
-                )
-            )
-            fig_count.update_layout(
-                title="Retention",
-                xaxis_title=date_range.capitalize(),
-                yaxis_title=f"Start {date_range.capitalize()}",
-                yaxis_autorange="reversed",
-                xaxis_side="top",
-            )
-
-            fig_percentage = go.Figure()
-            fig_percentage.add_trace(
-                go.Heatmap(
-                    x=retention_aggregated_percentage.columns,
-                    y=[
-                        x.strftime("%Y-%m-%d")
-                        for x in retention_aggregated_percentage.index
-                    ],
-                    z=retention_aggregated_percentage.values,
-                    hovertemplate="<b>Start: %{y}<br>"
-                    + f"{date_range.capitalize()}: "
-                    + "%{x}</b><br>%{z}%<extra></extra>",
-                    text=retention_aggregated_percentage.values,
-                    texttemplate="%{z}",
-                    colorscale="Blues",
-                    hoverongaps=False,
-                    xgap=1,
-                    ygap=1,
-                )
-            )
-            fig_percentage.update_layout(
-                title="Retention (%)",
-                xaxis_title=date_range.capitalize(),
-                yaxis_title=f"Start {date_range.capitalize()}",
-                yaxis_autorange="reversed",
-                xaxis_side="top",
+        fig_churn_count = go.Figure()
+        fig_churn_count.add_trace(
+            go.Bar(
+                x=churn_data.index,
+                y=churn_data["churn"],
+                name="Churn",
+                hovertemplate="<b>%{x}</b>: %{y} users<extra></extra>",
+                marker_color=DashboardColors.red,
             )
+        )
+        fig_churn_count.update_layout(
+            title="Churn users",
+            xaxis_title=date_range.capitalize(),
+            yaxis_title="Number of churn users",
+        )
+        return fig_churn_count
 
-            retention_data = retention_data.loc[
-                :, [f"start_{date_range}", date_range, "is_active"]
-            ]
-            for start_date_range in pd.unique(retention_data[f"start_{date_range}"]):
-                for d in self.date_range_dict[date_range]:
-                    retention_data = pd.concat(
-                        [
-                            retention_data,
-                            pd.DataFrame(
-                                [[start_date_range, d, 0]],
-                                columns=retention_data.columns,
-                            ),
-                        ],
-                        axis=0,
-                    )
-            retention_data = (
-                retention_data.groupby([f"start_{date_range}", date_range])
-                .sum()["is_active"]
-                .reset_index()
+    def get_chart_churn_percentage(self, date_range):
+        # Data
+        churn_data = self.get_churn_data(date_range)
+
+        fig_churn_percentage = go.Figure()
+        fig_churn_percentage.add_trace(
+            go.Scatter(
+                x=churn_data.index,
+                y=churn_data["churn_percentage"],
+                hovertemplate="<b>%{x}</b>: %{y}% churn<extra></extra>",
+                marker_color=DashboardColors.red,
+                marker_symbol="square",
+                mode="markers+lines",
             )
+        )
+        fig_churn_percentage.update_layout(
+            title="Churn users",
+            xaxis_title=date_range.capitalize(),
+            yaxis_title="Percentage of churn users",
+        )
+        return fig_churn_percentage
+
+    def get_chart_retention(self, date_range):
+        # Data
+        retention_aggregated_count, retention_aggregated_percentage = self.retention(
+            date_range
+        )
 
-            retention_data = (
-                retention_data.groupby([f"start_{date_range}", date_range])["is_active"]
-                .sum()
-                .reset_index()
-                .sort_values([f"start_{date_range}", date_range])
-                .rename(columns={"is_active": "number_active_users"})
+        fig_count = go.Figure()
+        fig_count.add_trace(
+            go.Heatmap(
+                x=retention_aggregated_count.columns,
+                y=[x.strftime("%Y-%m-%d") for x in retention_aggregated_count.index],
+                z=retention_aggregated_count.values,
+                hovertemplate="<b>Start: %{y}<br>"
+                + f"{date_range.capitalize()}: "
+                + "%{x}</b><br>%{z} users<extra></extra>",
+                text=retention_aggregated_count.values,
+                texttemplate="%{z}",
+                colorscale="Greens",
+                hoverongaps=False,
+                xgap=1,
+                ygap=1,
             )
+        )
+        fig_count.update_layout(
+            title="Retention",
+            xaxis_title=date_range.capitalize(),
+            yaxis_title=f"Start {date_range.capitalize()}",
+            yaxis_autorange="reversed",
+            xaxis_side="top",
+        )
 
-            retention_data.loc[
-                retention_data[f"start_{date_range}"] == retention_data[date_range],
-                "number_active_users",
-            ] = 0
+        fig_percentage = go.Figure()
+        fig_percentage.add_trace(
+            go.Heatmap(
+                x=retention_aggregated_percentage.columns,
+                y=[
+                    x.strftime("%Y-%m-%d")
+                    for x in retention_aggregated_percentage.index
+                ],
+                z=retention_aggregated_percentage.values,
+                hovertemplate="<b>Start: %{y}<br>"
+                + f"{date_range.capitalize()}: "
+                + "%{x}</b><br>%{z}%<extra></extra>",
+                text=retention_aggregated_percentage.values,
+                texttemplate="%{z}",
+                colorscale="Blues",
+                hoverongaps=False,
+                xgap=1,
+                ygap=1,
+            )
+        )
+        fig_percentage.update_layout(
+            title="Retention (%)",
+            xaxis_title=date_range.capitalize(),
+            yaxis_title=f"Start {date_range.capitalize()}",
+            yaxis_autorange="reversed",
+            xaxis_side="top",
+        )
 
-            fig_retention_curves = go.Figure()
+        retention_data = self.get_retention_curves(date_range)
 
-            for i, cohort in enumerate(
-                pd.unique(retention_data[f"start_{date_range}"])
-            ):
-                data_cohort = retention_data.loc[
-                    retention_data[f"start_{date_range}"] == cohort, :
-                ]
-                if date_range == "month":
-                    cohort_names = pd.to_datetime(str(cohort)).strftime("%b %Y")
-                else:
-                    cohort_names = pd.to_datetime(str(cohort)).strftime("%m/%d/%Y")
-                fig_retention_curves.add_trace(
-                    go.Scatter(
-                        x=data_cohort[date_range],
-                        y=data_cohort["number_active_users"],
-                        name=cohort_names,
-                        text=data_cohort[f"start_{date_range}"].apply(
-                            lambda x: (
-                                x.strftime("%b %Y")
-                                if date_range == "month"
-                                else x.strftime("%m/%d/%Y")
-                            )
-                        ),
-                        hovertemplate="<b>Cohort: %{text}</b><br><b>%{x}</b>: %{y} users<extra></extra>",
-                        stackgroup="one",
-                        mode="lines",
-                        marker_color=DashboardColors.palette_category[
-                            i % len(DashboardColors.palette_category)
-                        ],
-                        line_width=0,
-                    )
+        traces_retention_curves = []
+        for i, (cohort, data_cohort) in enumerate(
+            retention_data.groupby(f"start_{date_range}")
+        ):
+            if date_range == "month":
+                cohort_names = cohort.strftime("%b %Y")
+            else:
+                cohort_names = cohort.strftime("%m/%d/%Y")
+            traces_retention_curves.append(
+                go.Scatter(
+                    x=data_cohort[date_range],
+                    y=data_cohort["number_active_users"],
+                    name=cohort_names,
+                    text=[cohort_names] * len(data_cohort),
+                    hovertemplate="<b>Cohort: %{text}</b><br><b>%{x}</b>: %{y} users<extra></extra>",
+                    stackgroup="one",
+                    mode="lines",
+                    marker_color=DashboardColors.palette_category[
+                        i % len(DashboardColors.palette_category)
+                    ],
+                    line_width=0,
                 )
-            fig_retention_curves.update_layout(
-                title="Retention curves",
-                xaxis_title=date_range.capitalize(),
-                yaxis_title="Number of active users",
             )
+        fig_retention_curves = go.Figure(traces_retention_curves)
+        fig_retention_curves.update_layout(
+            title="Retention curves",
+            xaxis_title=date_range.capitalize(),
+            yaxis_title="Number of active users",
+        )
 
-            dict_chart["retention"] = [fig_retention_curves, fig_count, fig_percentage]
-
-        return dict_chart
+        return [fig_retention_curves, fig_count, fig_percentage]
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.activity import get_period_runs, get_runs_aggregated, get_runs_retention
+
+
+def get_partitions(user_codes, nb_partitions):
+    # Contiguous row slices of about the same size, users not split
+    bounds = np.linspace(0, len(user_codes), nb_partitions + 1).astype(np.int64)
+    bounds[1:-1] = np.searchsorted(user_codes, user_codes[bounds[1:-1]], side="left")
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
+
+
+def fit_partition(filename, row_start, row_end, periods, date_range):
+    # Input columns memory-mapped from the Arrow file, so not copied between
+    # processes
+    table = feather.read_table(filename, memory_map=True).slice(
+        row_start, row_end - row_start
+    )
+
+    runs = get_period_runs(
+        table["user"].to_numpy(),
+        table["start_date"].to_numpy(),
+        table["end_date"].to_numpy(),
+        periods,
+    )
+    retention_count, retention_total = get_runs_retention(runs, len(periods))
+    return runs, get_runs_aggregated(runs, periods, date_range), retention_count
+
+
+def fit_parallel(user_codes, start_dates, end_dates, date_range_dict, n_jobs, progress):
+    # Rows ordered by user, so that each partition is a slice of users
+    order = np.argsort(user_codes, kind="stable")
+    user_codes = np.asarray(user_codes)[order]
+    partitions = get_partitions(user_codes, n_jobs)
+
+    results = {date_range: [] for date_range in date_range_dict}
+    with tempfile.TemporaryDirectory() as path:
+        filename = os.path.join(path, "input.feather")
+        feather.write_feather(
+            pa.table(
+                {
+                    "user": user_codes,
+                    "start_date": np.asarray(start_dates)[order],
+                    "end_date": np.asarray(end_dates)[order],
+                }
+            ),
+            filename,
+            compression="uncompressed",
+        )
+
+        # Each date range and partition in its own task
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {}
+            for date_range in date_range_dict:
+                periods = pd.DatetimeIndex(date_range_dict[date_range]).values
+                for i, (row_start, row_end) in enumerate(partitions):
+                    future = executor.submit(
+                        fit_partition, filename, row_start, row_end, periods, date_range
+                    )
+                    futures[future] = (date_range, i)
+
+            for nb_done, future in enumerate(as_completed(futures), 1):
+                date_range, i = futures[future]
+                results[date_range].append((i, future.result()))
+                progress(f"fitting in {n_jobs} processes ({nb_done}/{len(futures)})")
+
+    # Partitions hold different users, so aggregates add up
+    fitted = {}
+    for date_range in date_range_dict:
+        partition_results = [x for _, x in sorted(results[date_range])]
+        runs = pd.concat([x[0] for x in partition_results], ignore_index=True)
+        active_user_data_aggregated = sum(x[1] for x in partition_results)
+        retention_count = sum(x[2] for x in partition_results)
+        fitted[date_range] = [runs, active_user_data_aggregated, retention_count]
+    return fitted
@@ -0,0 +1,136 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from utils.metrics import metrics
+from utils.model import DataModel
+
+# Version of the model and its stored files, to be increased on changes
+MODEL_VERSION = 2
+
+
+def write_frame(df, filename):
+    # Replace the file rather than overwrite it, memory-mapped reads of the
+    # previous file stay valid (temporary file by process, as several
+    # processes may save the same aggregates)
+    filename_tmp = f"{filename}.{os.getpid()}.tmp"
+    feather.write_feather(df, filename_tmp, compression="uncompressed")
+    os.replace(filename_tmp, filename)
+
+
+def read_frame(filename):
+    # Memory-mapped Arrow file, numeric columns without copy
+    table = feather.read_table(filename, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+@metrics.instrument("save_model", rows_in=lambda model, path: len(model.dataset))
+def save_model(model, path):
+    os.makedirs(path, exist_ok=True)
+
+    # Dataset with ID codes, and IDs by code
+    write_frame(
+        model.dataset.reset_index(drop=True), os.path.join(path, "dataset.feather")
+    )
+    write_frame(
+        pd.DataFrame({"user_id": model.users}), os.path.join(path, "users.feather")
+    )
+    write_frame(
+        pd.DataFrame({"subscription_id": model.subscriptions}),
+        os.path.join(path, "subscriptions.feather"),
+    )
+
+    save_aggregates(model, path)
+
+    # Metadata last, so that a model is only loaded once fully saved
+    with open(os.path.join(path, "model.json.tmp"), "w") as f:
+        json.dump({"max_end_date": model.max_end_date.isoformat()}, f)
+    os.replace(os.path.join(path, "model.json.tmp"), os.path.join(path, "model.json"))
+
+
+def save_aggregates(model, path):
+    # Aggregates of the date ranges computed so far and not saved yet (e.g.
+    # computed when first displayed after the model was saved), the others
+    # are computed on first access after load
+    for date_range, runs in model.activity_runs_dict.items():
+        filename = os.path.join(path, f"{date_range}_runs.feather")
+        if not os.path.isfile(filename):
+            write_frame(runs, filename)
+    for date_range, active_users in model.active_user_data_aggregated_dict.items():
+        filename = os.path.join(path, f"{date_range}_active_users.feather")
+        if not os.path.isfile(filename):
+            write_frame(active_users.reset_index(), filename)
+    for date_range, (retention_count, _) in model.retention_count_dict.items():
+        filename = os.path.join(path, f"{date_range}_retention.feather")
+        if not os.path.isfile(filename):
+            write_frame(
+                pd.DataFrame({"count": retention_count.ravel().astype(np.int32)}),
+                filename,
+            )
+
+    # Intervals of activity, for KPIs
+    filename = os.path.join(path, "intervals.feather")
+    if model.activity_intervals is not None and not os.path.isfile(filename):
+        write_frame(model.activity_intervals, filename)
+
+
+@metrics.instrument("load_model", rows_out=lambda model: len(model.dataset))
+def load_model(path):
+    with open(os.path.join(path, "model.json"), "r") as f:
+        metadata = json.load(f)
+
+    # Dataset, IDs and date ranges
+    model = DataModel(
+        read_frame(os.path.join(path, "dataset.feather")),
+        max_end_date=datetime.fromisoformat(metadata["max_end_date"]),
+        users=pd.Index(
+            read_frame(os.path.join(path, "users.feather"))["user_id"].values
+        ),
+        subscriptions=pd.Index(
+            read_frame(os.path.join(path, "subscriptions.feather"))[
+                "subscription_id"
+            ].values
+        ),
+    )
+
+    # Aggregates of the date ranges saved with the model
+    for date_range in model.date_range_dict:
+        periods = pd.DatetimeIndex(model.date_range_dict[date_range]).values
+
+        filename = os.path.join(path, f"{date_range}_runs.feather")
+        if os.path.isfile(filename):
+            model.activity_runs_dict[date_range] = read_frame(filename)
+
+        filename = os.path.join(path, f"{date_range}_active_users.feather")
+        if os.path.isfile(filename):
+            model.active_user_data_aggregated_dict[date_range] = read_frame(
+                filename
+            ).set_index(date_range)
+
+        # Cohort matrix, with cohort sizes at period number zero
+        filename = os.path.join(path, f"{date_range}_retention.feather")
+        if os.path.isfile(filename):
+            retention_count = (
+                feather.read_table(filename, memory_map=True)
+                .column("count")
+                .to_numpy()
+                .reshape(len(periods), len(periods))
+            )
+            model.retention_count_dict[date_range] = [
+                retention_count,
+                retention_count[:, 0],
+            ]
+
+    # Intervals of activity, with their sorted start dates
+    filename = os.path.join(path, "intervals.feather")
+    if os.path.isfile(filename):
+        model.activity_intervals = read_frame(filename)
+        model.activity_interval_starts = np.sort(
+            model.activity_intervals["start"].values
+        )
+
+    return model
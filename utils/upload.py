@@ -0,0 +1,47 @@
+import os
+import re
+
+from utils.files import remove_old_files
+
+UPLOAD_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+UPLOAD_BLOCK_SIZE = 1024**2
+
+
+class UploadStore:
+    def __init__(self, path, max_age=24 * 3600):
+        self.path = path
+        self.max_age = max_age
+
+    def get_filename(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise ValueError(f"Invalid upload ID {upload_id}")
+        return os.path.join(self.path, f"{upload_id}.csv")
+
+    def get_size(self, upload_id):
+        filename = self.get_filename(upload_id)
+        return os.path.getsize(filename) if os.path.isfile(filename) else 0
+
+    def append(self, upload_id, offset, stream):
+        # Chunks are written to disk as they are received, an upload
+        # interrupted at any point resumes from the size already written
+        os.makedirs(self.path, exist_ok=True)
+        if offset == 0:
+            self.clean()
+        with open(self.get_filename(upload_id), "ab") as f:
+            if f.tell() != offset:
+                raise ValueError(f"Chunk at {offset}, upload at {f.tell()}")
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                f.write(block)
+            return f.tell()
+
+    def remove(self, upload_id):
+        filename = self.get_filename(upload_id)
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+    def clean(self):
+        # Remove old and abandoned uploads
+        remove_old_files(self.path, self.max_age)